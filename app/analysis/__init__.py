@@ -1,6 +1,6 @@
 from .centrality import calculate_centrality_analysis
 from .clustering import calculate_clustering_and_density_analysis
-from .communities import detect_communities_asyn_lpa, detect_communities_louvain
+from .communities import detect_communities, load_updated_graph, update_communities
 from .components import calculate_connected_components_analysis
 from .degree import calculate_degree_distribution_analysis
 from .path import calculate_path_analysis
@@ -11,6 +11,7 @@ __all__ = [
     "calculate_connected_components_analysis",
     "calculate_degree_distribution_analysis",
     "calculate_path_analysis",
-    "detect_communities_asyn_lpa",
-    "detect_communities_louvain",
+    "detect_communities",
+    "load_updated_graph",
+    "update_communities",
 ]
@@ -0,0 +1,143 @@
+"""Betweenness centrality computed by batched Brandes passes over a CSR graph."""
+
+import random
+
+import numpy as np
+
+from app.constants import SEED_VALUE
+from app.csr import CsrGraph, deduplicate
+from app.parallel import map_sources_shards
+
+# Upper bound of the number of cells of the nodes and edges of a Brandes batch
+_BRANDES_BATCH_CELLS = 1 << 21
+
+
+def get_betweenness(
+    csr_graph: CsrGraph,
+    k: int | None = None,
+    seed: int = SEED_VALUE,
+    n_workers: int | None = 1,
+) -> np.ndarray:
+    """Compute the normalized betweenness centrality of the nodes.
+
+    Runs Brandes' algorithm from every node, or from `k` nodes sampled exactly as
+    `nx.betweenness_centrality` samples them with the same `seed`. The sources
+    are sharded across `n_workers` processes (`None` for all the CPUs), each one
+    returning the partial dependencies of its shard, which are summed up. The
+    normalization follows NetworkX, endpoints excluded.
+
+    Returns:
+        The betweenness of the nodes, aligned with `csr_graph.nodes`.
+    """
+    n_nodes = csr_graph.n_nodes
+    if k is None or k == n_nodes:
+        sources = np.arange(n_nodes)
+        is_sampled = False
+    else:
+        sampled_nodes = random.Random(seed).sample(csr_graph.nodes, k)  # noqa: S311
+        sources = csr_graph.get_node_indices(sampled_nodes)
+        is_sampled = True
+
+    betweenness = np.sum(
+        map_sources_shards(_get_shard_betweenness, csr_graph, sources, n_workers),
+        axis=0,
+    )
+    return _rescale(betweenness, sources if is_sampled else None)
+
+
+def _rescale(betweenness: np.ndarray, sampled_sources: np.ndarray | None) -> np.ndarray:
+    """Normalize by the number of the (source, target) pairs a node may lie on."""
+    n_targets = betweenness.size - 1
+    if n_targets < 2:  # noqa: PLR2004
+        return betweenness
+
+    if sampled_sources is None:
+        return betweenness / (n_targets * (n_targets - 1))
+
+    # A sampled source can not lie on its own paths, so it has one source less
+    n_sources = sampled_sources.size
+    scales = np.full(betweenness.size, 1 / (n_sources * (n_targets - 1)))
+    scales[sampled_sources] = (
+        1 / ((n_sources - 1) * (n_targets - 1)) if n_sources > 1 else np.nan
+    )
+    return betweenness * scales
+
+
+def _get_shard_betweenness(
+    sources: np.ndarray,
+    csr_graph: CsrGraph,
+) -> np.ndarray:
+    n_nodes = csr_graph.n_nodes
+    batch_size = max(1, _BRANDES_BATCH_CELLS // max(n_nodes + csr_graph.n_edges, 1))
+
+    betweenness = np.zeros(n_nodes, dtype=np.float64)
+    for start in range(0, sources.size, batch_size):
+        betweenness += _run_brandes_batch(
+            csr_graph,
+            sources[start : start + batch_size],
+        )
+    return betweenness
+
+
+def _run_brandes_batch(csr_graph: CsrGraph, sources: np.ndarray) -> np.ndarray:
+    """Accumulate the dependencies of the nodes on a batch of sources.
+
+    The BFSs of the batch advance together, the nodes being encoded as
+    `source_position * n_nodes + node`. The forward pass counts the shortest
+    paths level by level and keeps the edges of the shortest paths DAG, the
+    backward pass walks these edges in reverse to accumulate the dependencies.
+    """
+    n_nodes = csr_graph.n_nodes
+    n_cells = sources.size * n_nodes
+
+    is_reached = np.zeros(n_cells, dtype=bool)
+    n_paths = np.zeros(n_cells, dtype=np.float64)
+    # Scratch space to deduplicate and to index the nodes of a level
+    positions = np.empty(n_cells, dtype=np.int64)
+
+    frontier = np.arange(sources.size) * n_nodes + sources
+    is_reached[frontier] = True
+    n_paths[frontier] = 1.0
+    levels = [frontier]
+    dag_edges: list[tuple[np.ndarray, np.ndarray]] = []
+
+    while frontier.size:
+        _, counts, targets = csr_graph.gather_targets(frontier)
+        origins = np.repeat(frontier, counts)
+
+        is_next = ~is_reached[targets]
+        origins, targets = origins[is_next], targets[is_next]
+
+        frontier = deduplicate(targets, positions)
+        is_reached[frontier] = True
+
+        positions[frontier] = np.arange(frontier.size)
+        n_paths[frontier] = np.bincount(
+            positions[targets],
+            weights=n_paths[origins],
+            minlength=frontier.size,
+        )
+        levels.append(frontier)
+        dag_edges.append((origins, targets))
+
+    dependencies = np.zeros(n_cells, dtype=np.float64)
+    for level, (origins, targets) in zip(
+        reversed(levels[:-1]),
+        reversed(dag_edges),
+        strict=True,
+    ):
+        coefficients = n_paths[origins] / n_paths[targets] * (1 + dependencies[targets])
+        positions[level] = np.arange(level.size)
+        dependencies[level] = np.bincount(
+            positions[origins],
+            weights=coefficients,
+            minlength=level.size,
+        )
+
+    # The sources do not lie on their own paths
+    reached = np.concatenate(levels[1:])
+    return np.bincount(
+        reached % n_nodes,
+        weights=dependencies[reached],
+        minlength=n_nodes,
+    )
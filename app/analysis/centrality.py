@@ -6,18 +6,28 @@ import numpy as np
 import seaborn as sns
 import structlog
 
+from app.analysis.betweenness import get_betweenness
+from app.analysis.closeness import get_closeness
 from app.analysis.dtos import CentralityStats
+from app.analysis.spectral import (
+    get_spectral_centralities,
+    get_weighted_adjacency,
+    to_nodes_values,
+)
 from app.constants import centrality_plots_folder
+from app.csr import to_csr_graph
 from app.visualize import process_plot
 
 
 def calculate_centrality_analysis(
     graph: nx.Graph,
     graph_name: str | None = None,
+    n_workers: int | None = 1,
 ) -> list[Path]:
+    """Analyze the centralities, the BFSs running in `n_workers` processes."""
     logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
-    analysis_to = _calculate(graph)
+    analysis_to = _calculate(graph, n_workers)
     image_file_paths = _visualize_centrality_distributions(analysis_to, graph_name)
 
     logger.info(
@@ -27,17 +37,23 @@ def calculate_centrality_analysis(
     return image_file_paths
 
 
-def _calculate(graph: nx.Graph) -> CentralityStats:
-    eigenvector = nx.eigenvector_centrality(graph)
-    pagerank = nx.pagerank(graph)
-    katz = nx.katz_centrality(
-        graph,
-        alpha=0.005,
-        beta=1,
-        max_iter=5000,
+def _calculate(graph: nx.Graph, n_workers: int | None = 1) -> CentralityStats:
+    csr_graph = to_csr_graph(graph)
+    spectral = get_spectral_centralities(
+        csr_graph,
+        katz_alpha=0.005,
+        katz_beta=1,
+        weighted_adjacency=get_weighted_adjacency(graph, csr_graph),
+    )
+
+    eigenvector = to_nodes_values(csr_graph, spectral.eigenvector)
+    pagerank = to_nodes_values(csr_graph, spectral.pagerank)
+    katz = to_nodes_values(csr_graph, spectral.katz)
+    closeness = to_nodes_values(csr_graph, get_closeness(csr_graph, n_workers))
+    betweenness = to_nodes_values(
+        csr_graph,
+        get_betweenness(csr_graph, n_workers=n_workers),
     )
-    closeness = nx.closeness_centrality(graph)
-    betweenness = nx.betweenness_centrality(graph)
 
     return CentralityStats(
         eigenvector=eigenvector,
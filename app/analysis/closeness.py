@@ -0,0 +1,159 @@
+"""Closeness centrality, in full or for the top nodes only."""
+
+import contextlib
+import heapq
+
+import numpy as np
+import structlog
+from scipy.sparse.csgraph import connected_components
+
+from app.analysis.distances import get_sources_distances_histograms, iterate_bfs_levels
+from app.csr import CsrGraph
+
+
+def get_closeness(csr_graph: CsrGraph, n_workers: int | None = 1) -> np.ndarray:
+    """Compute the closeness centrality of all the nodes.
+
+    Follows `nx.closeness_centrality` for undirected graphs, including the
+    Wasserman and Faust scaling by the size of the component. Relies on the
+    batched BFSs of every node, run in `n_workers` processes (`None` for all the
+    CPUs).
+
+    Returns:
+        The closeness of the nodes, aligned with `csr_graph.nodes`.
+    """
+    histograms = get_sources_distances_histograms(csr_graph, n_workers=n_workers)
+    n_reached = histograms.sum(axis=1)
+    farness = histograms @ np.arange(histograms.shape[1])
+    return _get_closeness(n_reached, farness, csr_graph.n_nodes)
+
+
+def get_top_closeness(csr_graph: CsrGraph, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Find the `k` nodes of the highest closeness centrality, exactly.
+
+    Prunes the BFSs as Bergamini et al. do. The nodes are processed by
+    decreasing degree, and the BFS of a node stops as soon as a lower bound of
+    its farness proves it can not beat the current `k`-th closeness. After the
+    level `d`, the unvisited nodes of the component are at distance `d + 1` at
+    best, and the next level can not hold more nodes than the edges leaving the
+    current one, so the remaining ones are at distance `d + 2` at least. The graph
+    has to be undirected.
+
+    Returns:
+        The indices of the top nodes ordered by decreasing closeness, ties broken
+        by the index, along with their closeness.
+    """
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    n_nodes = csr_graph.n_nodes
+    k = min(k, n_nodes)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    degrees = csr_graph.degrees
+
+    _, labels = connected_components(csr_graph.to_scipy(), directed=False)
+    component_sizes = np.bincount(labels)[labels]
+
+    # Scratch spaces shared by the BFSs
+    is_visited = np.zeros(n_nodes, dtype=bool)
+    positions = np.empty(n_nodes, dtype=np.int64)
+
+    # Min-heap of the `k` best (closeness, -index) pairs
+    top: list[tuple[float, int]] = []
+    n_pruned = 0
+
+    for node in np.argsort(-degrees, kind="stable").tolist():
+        n_component = int(component_sizes[node])
+        threshold = top[0][0] if len(top) == k else -np.inf
+
+        closeness = _run_pruned_bfs(
+            csr_graph,
+            node,
+            n_component,
+            threshold,
+            degrees,
+            is_visited,
+            positions,
+        )
+        if closeness is None:
+            n_pruned += 1
+            continue
+
+        if len(top) < k:
+            heapq.heappush(top, (closeness, -node))
+        else:
+            heapq.heappushpop(top, (closeness, -node))
+
+    logger.debug("Top closeness found", k=k, n_nodes=n_nodes, n_pruned=n_pruned)
+
+    top.sort(reverse=True)
+    return (
+        np.array([-index for _, index in top], dtype=np.int64),
+        np.array([closeness for closeness, _ in top], dtype=np.float64),
+    )
+
+
+def _run_pruned_bfs(
+    csr_graph: CsrGraph,
+    source: int,
+    n_component: int,
+    threshold: float,
+    degrees: np.ndarray,
+    is_visited: np.ndarray,
+    positions: np.ndarray,
+) -> float | None:
+    """Get the closeness of `source`, or `None` once it is proven below `threshold`.
+
+    Resets `is_visited` before returning.
+    """
+    n_nodes = csr_graph.n_nodes
+
+    n_reached, farness = 0, 0
+    with contextlib.closing(
+        iterate_bfs_levels(csr_graph, source, is_visited, positions)
+    ) as levels:
+        for distance, level in enumerate(levels):
+            n_reached += level.size
+            farness += distance * level.size
+
+            n_left = n_component - n_reached
+            if not n_left:
+                break
+            # Every edge of the source leads to the next level
+            if not distance:
+                continue
+
+            n_next = min(n_left, int(degrees[level].sum()) - level.size)
+            farness_lower_bound = (
+                farness + (distance + 1) * n_next + (distance + 2) * (n_left - n_next)
+            )
+            closeness_upper_bound = _get_closeness(
+                n_component,
+                farness_lower_bound,
+                n_nodes,
+            )
+            if closeness_upper_bound < threshold:
+                return None
+
+    return float(_get_closeness(n_reached, farness, n_nodes))
+
+
+def _get_closeness(
+    n_reached: np.ndarray | int,
+    farness: np.ndarray | int,
+    n_nodes: int,
+) -> np.ndarray:
+    """Get the closeness, scaled by the fraction of the nodes reached.
+
+    Keeps the operations order of NetworkX, so that the ties are the same.
+    """
+    n_others = np.asarray(n_reached, dtype=np.float64) - 1
+    farness = np.asarray(farness, dtype=np.float64)
+    closeness = np.divide(
+        n_others,
+        farness,
+        out=np.zeros_like(farness),
+        where=farness > 0,
+    )
+    return closeness * (n_others / max(n_nodes - 1, 1))
@@ -5,7 +5,15 @@ import numpy as np
 import seaborn as sns
 import structlog
 
-from app.analysis.dtos import ClusteringStats
+from app.analysis.dtos import ApproximateClusteringStats, ClusteringStats
+from app.analysis.triangles import (
+    ClusteringEstimates,
+    TriangleCounts,
+    count_triangles,
+    estimate_clustering,
+)
+from app.configs import get_configs
+from app.csr import to_csr_graph
 from app.visualize import process_plot
 
 
@@ -13,13 +21,31 @@ def calculate_clustering_and_density_analysis(
     graph: nx.Graph,
     graph_name: str | None = None,
 ) -> Path:
+    """Analyze the clustering from a single triangle counting pass.
+
+    Graphs with more edges than `ANALYSIS_APPROXIMATE_CLUSTERING_N_EDGES` are
+    analyzed approximately instead, from `ANALYSIS_CLUSTERING_N_WEDGES` sampled
+    wedges, the distribution covering sampled nodes only.
+    """
+    configs = get_configs()
     logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
+    csr_graph = to_csr_graph(graph)
+
+    analysis_to: ClusteringStats | ApproximateClusteringStats
+    if graph.number_of_edges() > configs.ANALYSIS_APPROXIMATE_CLUSTERING_N_EDGES:
+        estimates = estimate_clustering(csr_graph, configs.ANALYSIS_CLUSTERING_N_WEDGES)
+        clustering = estimates.sampled_clustering
+        analysis_to = _approximate_analysis(graph, estimates)
+    else:
+        triangle_counts = count_triangles(csr_graph)
+        clustering = triangle_counts.get_clustering()
+        analysis_to = _calculate_analysis(graph, triangle_counts)
+
     visualization_image_file_path = _visualize_clustering_coefficient_distribution(
-        graph,
+        clustering,
         graph_name,
     )
-    analysis_to = _calculate_analysis(graph)
     logger.info(
         "Clustering and density analysis",
         graph_name=graph_name,
@@ -33,9 +59,12 @@ def calculate_clustering_and_density_analysis(
     return visualization_image_file_path
 
 
-def _calculate_analysis(graph: nx.Graph) -> ClusteringStats:
-    global_clustering = nx.transitivity(graph)
-    average_clustering = nx.average_clustering(graph)
+def _calculate_analysis(
+    graph: nx.Graph,
+    triangle_counts: TriangleCounts,
+) -> ClusteringStats:
+    global_clustering = triangle_counts.get_transitivity()
+    average_clustering = triangle_counts.get_average_clustering()
     density = nx.density(graph)
 
     return ClusteringStats(
@@ -45,12 +74,30 @@ def _calculate_analysis(graph: nx.Graph) -> ClusteringStats:
     )
 
 
-def _visualize_clustering_coefficient_distribution(
+def _approximate_analysis(
     graph: nx.Graph,
+    estimates: ClusteringEstimates,
+) -> ApproximateClusteringStats:
+    return ApproximateClusteringStats(
+        global_clustering=estimates.transitivity,
+        global_clustering_ci=(
+            estimates.transitivity - estimates.transitivity_half_width,
+            estimates.transitivity + estimates.transitivity_half_width,
+        ),
+        average_clustering=estimates.average_clustering,
+        average_clustering_ci=(
+            estimates.average_clustering - estimates.average_clustering_half_width,
+            estimates.average_clustering + estimates.average_clustering_half_width,
+        ),
+        density=nx.density(graph),
+        n_wedges=estimates.n_samples,
+    )
+
+
+def _visualize_clustering_coefficient_distribution(
+    coeff_array: np.ndarray,
     graph_name: str | None = None,
 ) -> Path:
-    clustering_values = list(nx.clustering(graph).values())
-    coeff_array = np.array(clustering_values)
     ax = sns.histplot(coeff_array, kde=True)
 
     title = "Distribution of Node Clustering Coefficients"
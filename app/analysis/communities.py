@@ -1,91 +1,412 @@
+"""Communities detection over several seeds, evaluated and merged into a consensus."""
+
 import contextlib
-from collections import defaultdict
+import pickle
+from collections.abc import Iterable
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
+import scipy.sparse as sp
 import seaborn as sns
 import structlog
 
 from app.analysis.dtos import CommunitiesInternalEvaluation
-from app.constants import SEED_VALUE
+from app.analysis.leiden import get_communities, update_frontier_communities
+from app.configs import get_configs
+from app.constants import SEED_VALUE, cache_files_directory
+from app.parallel import get_n_workers, process_pool
 from app.visualize import process_plot, run_base_graph_visualization
+from app.vos import CommunityDetectionAlgorithm
+
+_ALGORITHMS_TITLES = {
+    CommunityDetectionAlgorithm.LOUVAIN: "Louvain",
+    CommunityDetectionAlgorithm.ASYN_LPA: "Async LPA",
+    CommunityDetectionAlgorithm.CSR_LOUVAIN: "Louvain",
+    CommunityDetectionAlgorithm.LEIDEN: "Leiden",
+}
+
+# Algorithms running over the sparse adjacency only
+_CSR_ALGORITHMS = frozenset(
+    (CommunityDetectionAlgorithm.CSR_LOUVAIN, CommunityDetectionAlgorithm.LEIDEN)
+)
+
+_worker_graph: nx.Graph | None = None
+_worker_adjacency: sp.csr_array | None = None
+
+
+class CommunitiesPartitions(NamedTuple):
+    """Partitions found with several seeds, labels aligned with `graph.nodes()`.
+
+    There is no consensus partition for a single seed.
+    """
+
+    seeds: list[int]
+    labels: list[np.ndarray]
+    evaluations: list[CommunitiesInternalEvaluation]
+    best: int
+    consensus_labels: np.ndarray | None
+    consensus_evaluation: CommunitiesInternalEvaluation | None
+
 
+class PersistedPartition(NamedTuple):
+    """Partition kept between the incremental updates of the communities."""
 
-def detect_communities_louvain(
+    community_index: dict[Any, int]
+    # Modularity right after the last detection from scratch
+    reference_modularity: float
+
+
+class CommunitiesUpdate(NamedTuple):
+    """Updated graph and partition, labels aligned with `graph.nodes()`."""
+
+    graph: nx.Graph
+    labels: np.ndarray
+    evaluation: CommunitiesInternalEvaluation
+    is_refreshed: bool
+
+
+def detect_communities(
     graph: nx.Graph,
     graph_name: str | None = None,
-) -> Path:
-    communities: list[set] = nx.algorithms.community.louvain_communities(
+    algorithm: CommunityDetectionAlgorithm = CommunityDetectionAlgorithm.LOUVAIN,
+    n_seeds: int = 1,
+    n_workers: int | None = 1,
+    consensus_threshold: float = 0.5,
+) -> list[Path]:
+    """Detect the communities with `n_seeds` seeds and visualize the best ones.
+
+    The best partition is the one of the highest modularity. The consensus one
+    is visualized as well when there are several seeds, see `find_communities`.
+    """
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+    title = f"Communities: {_ALGORITHMS_TITLES[algorithm]}"
+
+    partitions = find_communities(
         graph,
-        seed=SEED_VALUE,
+        algorithm,
+        n_seeds,
+        n_workers,
+        consensus_threshold,
+    )
+    best_labels = partitions.labels[partitions.best]
+    best_evaluation_to = partitions.evaluations[partitions.best]
+    logger.info(
+        "Best partition",
+        algorithm=algorithm.value,
+        seed=partitions.seeds[partitions.best],
+        n_communities=int(best_labels.max()) + 1,
+        modularities=[evaluation.modularity for evaluation in partitions.evaluations],
     )
 
-    community_index: dict[Any, int] = {}
-    for community_id, community in enumerate(communities):
-        for node in community:
-            community_index[node] = community_id
-
-    internal_evaluation_to = _evaluate_communities(graph, community_index)
+    image_file_paths = [
+        _visualize_partition(graph, graph_name, best_labels, best_evaluation_to, title)
+    ]
+    if partitions.consensus_labels is not None:
+        logger.info(
+            "Consensus partition",
+            algorithm=algorithm.value,
+            n_communities=int(partitions.consensus_labels.max()) + 1,
+            modularity=partitions.consensus_evaluation.modularity,
+        )
+        image_file_paths.append(
+            _visualize_partition(
+                graph,
+                graph_name,
+                partitions.consensus_labels,
+                partitions.consensus_evaluation,
+                f"{title} consensus",
+            )
+        )
 
-    palette = sns.color_palette("husl", len(communities))
-    node_colors = [palette[community_index[node]] for node in graph.nodes()]
+    logger.info(
+        "Communities visualization",
+        algorithm=algorithm.value,
+        image_file_paths=image_file_paths,
+    )
+    return image_file_paths
 
-    run_base_graph_visualization(graph, graph_name, node_color=node_colors)
 
-    evaluation_text: str = "\n".join(
-        f"{key}: {value}" for key, value in internal_evaluation_to.model_dump().items()
+def find_communities(
+    graph: nx.Graph,
+    algorithm: CommunityDetectionAlgorithm,
+    n_seeds: int = 1,
+    n_workers: int | None = 1,
+    consensus_threshold: float = 0.5,
+) -> CommunitiesPartitions:
+    """Run the detection with the seeds `SEED_VALUE`, `SEED_VALUE + 1`, etc.
+
+    The runs are spread across `n_workers` processes (`None` for all the CPUs),
+    the graph or its sparse adjacency being sent once per worker. Every partition
+    is evaluated over the same edges. The consensus partition follows
+    Lancichinetti and Fortunato for a single round: the co-assignment matrix,
+    restricted to the edges, holds the fraction of the runs putting both
+    endpoints in the same community. The entries below `consensus_threshold` are
+    dropped and Leiden clusters the rest as a weighted graph. It is skipped for a
+    single seed.
+    """
+    seeds = [SEED_VALUE + offset for offset in range(n_seeds)]
+
+    adjacency = nx.to_scipy_sparse_array(graph, weight="weight", format="csr")
+
+    n_workers = min(get_n_workers(n_workers), n_seeds)
+    if n_workers <= 1:
+        labels = [_run_detection(seed, algorithm, graph, adjacency) for seed in seeds]
+    else:
+        with process_pool(
+            n_workers,
+            initializer=_init_worker,
+            initargs=(None if algorithm in _CSR_ALGORITHMS else graph, adjacency),
+        ) as executor:
+            labels = list(executor.map(_run_detection, seeds, repeat(algorithm)))
+
+    # Every edge once, self-loops included
+    edges = sp.triu(adjacency, format="coo")
+    evaluations = [_evaluate_communities(edges, partition) for partition in labels]
+    best = max(range(n_seeds), key=lambda index: evaluations[index].modularity)
+
+    consensus_labels = consensus_evaluation = None
+    if n_seeds > 1:
+        consensus_labels = _get_consensus_labels(edges, labels, consensus_threshold)
+        consensus_evaluation = _evaluate_communities(edges, consensus_labels)
+
+    return CommunitiesPartitions(
+        seeds=seeds,
+        labels=labels,
+        evaluations=evaluations,
+        best=best,
+        consensus_labels=consensus_labels,
+        consensus_evaluation=consensus_evaluation,
     )
-    plt.gcf().text(
-        0.8,
-        0.6,
-        evaluation_text,
-        fontsize=50,
-        bbox={"facecolor": "white", "alpha": 0.7},
-        verticalalignment="center",
+
+
+def update_communities(
+    graph: nx.Graph,
+    graph_name: str,
+    inserted_edges: Iterable[tuple[Any, ...]] = (),
+    deleted_edges: Iterable[tuple[Any, ...]] = (),
+    algorithm: CommunityDetectionAlgorithm = CommunityDetectionAlgorithm.LEIDEN,
+) -> CommunitiesUpdate:
+    """Apply a batch of edge changes to a copy of `graph` and update its communities.
+
+    The updated graph and its partition are persisted per `graph_name` and
+    `algorithm`, pass the graph of `load_updated_graph` to apply the next batch
+    on top of this one. Without a persisted partition, the communities are
+    detected from scratch with the seed `SEED_VALUE`. Otherwise, only the nodes
+    around the changed edges are moved, see `update_frontier_communities`, the new
+    nodes starting alone. Once the modularity drifts from the one of the last
+    detection from scratch by more than `ANALYSIS_COMMUNITIES_MAX_MODULARITY_DRIFT`,
+    the communities are detected from scratch again. `graph` is left untouched.
+    """
+    configs = get_configs()
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    cache_file_path, edges_cache_file_path = _get_update_cache_files_paths(
+        graph_name,
+        algorithm,
     )
 
-    title = "Communities: Louvain"
-    plt.title(title, fontsize=100)
+    persisted_partition: PersistedPartition | None = None
+    if cache_file_path.exists():
+        with contextlib.suppress(Exception), cache_file_path.open("rb") as f:
+            logger.info("Using a persisted partition", cache_file_path=cache_file_path)
+            persisted_partition = pickle.load(f)
+
+    inserted_edges, deleted_edges = list(inserted_edges), list(deleted_edges)
+    graph = graph.copy()
+    graph.remove_edges_from(deleted_edges)
+    graph.add_edges_from(inserted_edges)
+
+    nodes = list(graph.nodes())
+    adjacency = nx.to_scipy_sparse_array(graph, weight="weight", format="csr")
+    edges = sp.triu(adjacency, format="coo")
+
+    is_refreshed = persisted_partition is None
+    if persisted_partition is not None:
+        reference_modularity = persisted_partition.reference_modularity
+        community_index = persisted_partition.community_index
+        labels = np.fromiter(
+            (community_index.get(node, -1) for node in nodes),
+            dtype=np.int64,
+            count=len(nodes),
+        )
+        is_new = labels < 0
+        labels[is_new] = max(community_index.values(), default=-1) + 1
+        labels[is_new] += np.arange(int(is_new.sum()))
+
+        node_index = {node: index for index, node in enumerate(nodes)}
+        changed_nodes = np.array(
+            sorted(
+                {
+                    node_index[node]
+                    for edge in inserted_edges + deleted_edges
+                    for node in edge[:2]
+                    if node in node_index
+                }
+            ),
+            dtype=np.int64,
+        )
+        labels = update_frontier_communities(adjacency, labels, changed_nodes)
+        evaluation_to = _evaluate_communities(edges, labels)
+
+        modularity_drift = abs(evaluation_to.modularity - reference_modularity)
+        is_refreshed = (
+            modularity_drift > configs.ANALYSIS_COMMUNITIES_MAX_MODULARITY_DRIFT
+        )
+        logger.info(
+            "Communities updated",
+            n_changed_nodes=changed_nodes.size,
+            modularity=evaluation_to.modularity,
+            modularity_drift=modularity_drift,
+        )
+
+    if is_refreshed:
+        labels = _run_detection(SEED_VALUE, algorithm, graph, adjacency)
+        evaluation_to = _evaluate_communities(edges, labels)
+        reference_modularity = evaluation_to.modularity
+        logger.info(
+            "Communities detected from scratch",
+            algorithm=algorithm.value,
+            modularity=evaluation_to.modularity,
+        )
 
-    file_path = Path(f"{title}.png")
-    if graph_name is not None:
-        file_path = Path(graph_name) / file_path
+    logger.info(
+        "Persisting the graph and the partition",
+        edges_cache_file_path=edges_cache_file_path,
+        cache_file_path=cache_file_path,
+    )
+    with edges_cache_file_path.open("wb") as f:
+        pickle.dump(list(nx.to_edgelist(graph)), f)
+    with cache_file_path.open("wb") as f:
+        pickle.dump(
+            PersistedPartition(
+                community_index=dict(zip(nodes, labels.tolist(), strict=True)),
+                reference_modularity=reference_modularity,
+            ),
+            f,
+        )
+
+    return CommunitiesUpdate(
+        graph=graph,
+        labels=labels,
+        evaluation=evaluation_to,
+        is_refreshed=is_refreshed,
+    )
 
-    image_file_path = process_plot(file_path=file_path)
 
+def load_updated_graph(
+    graph_name: str,
+    algorithm: CommunityDetectionAlgorithm = CommunityDetectionAlgorithm.LEIDEN,
+) -> nx.Graph | None:
+    """Load the graph persisted by the last `update_communities` call, if any.
+
+    The graph is rebuilt from its edge list, so the isolated nodes are dropped.
+    """
     logger: structlog.stdlib.BoundLogger = structlog.get_logger()
-    logger.info(
-        "Communities: Louvain visualization",
-        image_file_path=image_file_path,
+
+    _, edges_cache_file_path = _get_update_cache_files_paths(graph_name, algorithm)
+    if not edges_cache_file_path.exists():
+        return None
+
+    with edges_cache_file_path.open("rb") as f:
+        logger.info(
+            "Using a persisted graph",
+            edges_cache_file_path=edges_cache_file_path,
+        )
+        return nx.from_edgelist(pickle.load(f))
+
+
+def _get_update_cache_files_paths(
+    graph_name: str,
+    algorithm: CommunityDetectionAlgorithm,
+) -> tuple[Path, Path]:
+    """Get the paths of the persisted partition and edge list of the updates."""
+    cache_files_dir = cache_files_directory / Path("communities")
+    cache_files_dir.mkdir(parents=True, exist_ok=True)
+
+    file_name_prefix = f"{graph_name}_{algorithm.value}"
+    return (
+        cache_files_dir / Path(f"{file_name_prefix}_partition.pkl"),
+        cache_files_dir / Path(f"{file_name_prefix}_edges.pkl"),
     )
-    return image_file_path
 
 
-def detect_communities_asyn_lpa(
-    graph: nx.Graph,
-    graph_name: str | None = None,
-) -> Path:
-    communities: list[set] = list(
-        nx.algorithms.community.asyn_lpa_communities(graph, seed=SEED_VALUE)
+def _get_consensus_labels(
+    edges: sp.coo_array,
+    labels: list[np.ndarray],
+    consensus_threshold: float,
+) -> np.ndarray:
+    """Cluster the edges kept by the co-assignment matrix of the partitions."""
+    co_assignment = np.mean(
+        [partition[edges.row] == partition[edges.col] for partition in labels],
+        axis=0,
+    )
+    is_kept = co_assignment >= consensus_threshold
+    consensus_edges = sp.coo_array(
+        (co_assignment[is_kept], (edges.row[is_kept], edges.col[is_kept])),
+        shape=edges.shape,
+    )
+    return get_communities(
+        (consensus_edges + sp.triu(consensus_edges, k=1).T).tocsr(),
+        seed=SEED_VALUE,
     )
 
-    community_index: dict[Any, int] = {}
-    for community_id, community in enumerate(communities):
-        for node in community:
-            community_index[node] = community_id
 
-    internal_evaluation_to = _evaluate_communities(graph, community_index)
+def _init_worker(graph: nx.Graph | None, adjacency: sp.csr_array) -> None:
+    global _worker_graph, _worker_adjacency  # noqa: PLW0603
+    _worker_graph = graph
+    _worker_adjacency = adjacency
+
+
+def _run_detection(
+    seed: int,
+    algorithm: CommunityDetectionAlgorithm,
+    graph: nx.Graph | None = None,
+    adjacency: sp.csr_array | None = None,
+) -> np.ndarray:
+    """Get the community label of every node, aligned with `graph.nodes()`."""
+    if graph is None:
+        graph, adjacency = _worker_graph, _worker_adjacency
+
+    match algorithm:
+        case CommunityDetectionAlgorithm.CSR_LOUVAIN:
+            return get_communities(adjacency, refine=False, seed=seed)
+        case CommunityDetectionAlgorithm.LEIDEN:
+            return get_communities(adjacency, seed=seed)
+        case CommunityDetectionAlgorithm.LOUVAIN:
+            communities = nx.algorithms.community.louvain_communities(graph, seed=seed)
+        case CommunityDetectionAlgorithm.ASYN_LPA:
+            communities = nx.algorithms.community.asyn_lpa_communities(graph, seed=seed)
+
+    community_index = {
+        node: community_id
+        for community_id, community in enumerate(communities)
+        for node in community
+    }
+    return np.fromiter(
+        (community_index[node] for node in graph.nodes()),
+        dtype=np.int64,
+        count=graph.number_of_nodes(),
+    )
 
-    palette = sns.color_palette("husl", len(communities))
-    node_colors = [palette[community_index[node]] for node in graph.nodes()]
+
+def _visualize_partition(
+    graph: nx.Graph,
+    graph_name: str | None,
+    labels: np.ndarray,
+    evaluation_to: CommunitiesInternalEvaluation,
+    title: str,
+) -> Path:
+    palette = sns.color_palette("husl", int(labels.max()) + 1)
+    node_colors = [palette[label] for label in labels.tolist()]
 
     run_base_graph_visualization(graph, graph_name, node_color=node_colors)
 
     evaluation_text: str = "\n".join(
-        f"{key}: {value}" for key, value in internal_evaluation_to.model_dump().items()
+        f"{key}: {value}" for key, value in evaluation_to.model_dump().items()
     )
     plt.gcf().text(
         0.8,
@@ -96,26 +417,18 @@ def detect_communities_asyn_lpa(
         verticalalignment="center",
     )
 
-    title = "Communities: Async LPA"
     plt.title(title, fontsize=100)
 
     file_path = Path(f"{title}.png")
     if graph_name is not None:
         file_path = Path(graph_name) / file_path
 
-    image_file_path = process_plot(file_path=file_path)
-
-    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
-    logger.info(
-        "Communities: Async LPA visualization",
-        image_file_path=image_file_path,
-    )
-    return image_file_path
+    return process_plot(file_path=file_path)
 
 
 def _evaluate_communities(
-    graph: nx.Graph,
-    community_index: dict[Any, int],
+    edges: sp.coo_array,
+    labels: np.ndarray,
 ) -> CommunitiesInternalEvaluation:
     """Conduct internal communities evaluation.
 
@@ -124,44 +437,69 @@ def _evaluate_communities(
       - Average Node Degree
       - Modularity
       - Conductance
+
+    Takes the community labels of the nodes and scans the edges once, counting
+    the internal edges, the cut edges and the volumes of all the communities with
+    `np.bincount`. Follows NetworkX: the modularity is weighted, the other
+    metrics are not, and the conductance of a community is 0 when undefined.
     """
-    communities_dict: dict[int, set] = defaultdict(set)
-    for node, comm_id in community_index.items():
-        communities_dict[comm_id].add(node)
-
-    communities = list(communities_dict.values())
-
-    densities = []
-    avg_degrees = []
-    conductances = []
-
-    for community in communities:
-        n_nodes = len(community)
-        subgraph: nx.Graph = graph.subgraph(community)
-        internal_edges = subgraph.number_of_edges()
-
-        match n_nodes:
-            case 0 | 1:
-                densities.append(0.0)
-                avg_degrees.append(0.0)
-            case _:
-                max_possible_edges = n_nodes * (n_nodes - 1) / 2
-                density = internal_edges / max_possible_edges
-                densities.append(density)
-
-                avg_degree = (2 * internal_edges) / n_nodes
-                avg_degrees.append(avg_degree)
-
-        community_conductance = 0.0
-        with contextlib.suppress(Exception):
-            community_conductance = nx.algorithms.cuts.conductance(graph, community)
-        conductances.append(community_conductance)
-
-    avg_internal_density = float(np.mean(densities)) if densities else 0.0
-    avg_node_degree = float(np.mean(avg_degrees)) if avg_degrees else 0.0
-    avg_conductance = float(np.mean(conductances)) if conductances else 0.0
-
-    modularity = nx.algorithms.community.quality.modularity(graph, communities)
+    _, labels = np.unique(labels, return_inverse=True)
+    n_communities = int(labels.max()) + 1 if labels.size else 0
+
+    rows, cols, weights = edges.row, edges.col, edges.data
+    row_labels, col_labels = labels[rows], labels[cols]
+    is_internal = row_labels == col_labels
+
+    sizes = np.bincount(labels, minlength=n_communities)
+    internal_edges = np.bincount(row_labels[is_internal], minlength=n_communities)
+    cut_edges = np.bincount(
+        np.concatenate((row_labels[~is_internal], col_labels[~is_internal])),
+        minlength=n_communities,
+    )
+    degrees = np.bincount(np.concatenate((rows, cols)), minlength=labels.size)
+    volumes = np.bincount(labels, weights=degrees, minlength=n_communities)
+
+    has_pairs = sizes > 1
+    densities = np.zeros(n_communities, dtype=np.float64)
+    densities[has_pairs] = internal_edges[has_pairs] / (
+        sizes[has_pairs] * (sizes[has_pairs] - 1) / 2
+    )
+    avg_degrees = np.zeros(n_communities, dtype=np.float64)
+    avg_degrees[has_pairs] = 2 * internal_edges[has_pairs] / sizes[has_pairs]
+
+    smaller_volumes = np.minimum(volumes, volumes.sum() - volumes)
+    conductances = np.divide(
+        cut_edges,
+        smaller_volumes,
+        out=np.zeros(n_communities, dtype=np.float64),
+        where=smaller_volumes > 0,
+    )
+
+    avg_internal_density = float(densities.mean()) if n_communities else 0.0
+    avg_node_degree = float(avg_degrees.mean()) if n_communities else 0.0
+    avg_conductance = float(conductances.mean()) if n_communities else 0.0
+
+    total_weight = weights.sum()
+    internal_weights = np.bincount(
+        row_labels[is_internal],
+        weights=weights[is_internal],
+        minlength=n_communities,
+    )
+    weighted_volumes = np.bincount(
+        np.concatenate((row_labels, col_labels)),
+        weights=np.concatenate((weights, weights)),
+        minlength=n_communities,
+    )
+    modularity = (
+        float(
+            (
+                internal_weights / total_weight
+                - (weighted_volumes / (2 * total_weight)) ** 2
+            ).sum()
+        )
+        if total_weight
+        else 0.0
+    )
 
     return CommunitiesInternalEvaluation(
         internal_edge_density=avg_internal_density,
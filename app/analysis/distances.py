@@ -0,0 +1,259 @@
+"""Shortest path lengths computed by batched breadth-first searches (BFS)."""
+
+from collections.abc import Iterator
+
+import numpy as np
+
+from app.csr import CsrGraph, deduplicate
+from app.parallel import map_sources_shards
+from app.vos import BfsEngine
+
+# Upper bound of the number of cells of the visited flags of a BFS batch
+_BFS_BATCH_CELLS = 1 << 22
+
+# Upper bound of the number of words gathered along the edges by a bit-parallel
+# BFS batch
+_BIT_PARALLEL_BATCH_WORDS = 1 << 22
+
+_WORD_BITS = 64
+
+
+def get_distances_histogram(
+    csr_graph: CsrGraph,
+    sources: np.ndarray | None = None,
+    n_workers: int | None = 1,
+    engine: BfsEngine = BfsEngine.BATCHED,
+) -> np.ndarray:
+    """Count the reachable (source, target) pairs by their distance.
+
+    Both engines are exact. The bit-parallel one pulls the frontiers along the
+    edges, so it expects an undirected graph.
+
+    Returns:
+        The array whose element `d` is the number of the ordered pairs at distance
+        `d`, `d` going from 0 to `n_nodes - 1`. An undirected pair counts twice.
+    """
+    histogram = np.zeros(max(csr_graph.n_nodes, 1), dtype=np.int64)
+
+    match engine:
+        case BfsEngine.BATCHED:
+            sources_histograms = get_sources_distances_histograms(
+                csr_graph,
+                sources,
+                n_workers,
+            )
+            histogram[: sources_histograms.shape[1]] = sources_histograms.sum(axis=0)
+        case BfsEngine.BIT_PARALLEL:
+            for shard_histogram in map_sources_shards(
+                _get_shard_bit_parallel_histogram,
+                csr_graph,
+                sources,
+                n_workers,
+            ):
+                histogram += shard_histogram
+
+    return histogram
+
+
+def get_sources_distances_histograms(
+    csr_graph: CsrGraph,
+    sources: np.ndarray | None = None,
+    n_workers: int | None = 1,
+) -> np.ndarray:
+    """Count the nodes reachable from every source by their distance.
+
+    Runs a BFS from every source, all the sources by default, and keeps only the
+    sizes of the BFS levels, so the distances are never stored. The BFSs of a
+    batch of sources advance together, the nodes being encoded as
+    `source_position * n_nodes + node`.
+
+    The sources are sharded across `n_workers` processes (`None` for all the
+    CPUs). Each worker returns the histograms of its shard only, and the integer
+    histograms are merged, so the result does not depend on the sharding.
+
+    Returns:
+        The matrix whose element `(i, d)` is the number of nodes at distance `d`
+        from `sources[i]`, `d` going up to the largest distance found.
+    """
+    shards_histograms = map_sources_shards(
+        _get_shard_histograms,
+        csr_graph,
+        sources,
+        n_workers,
+    )
+    n_distances = max(histograms.shape[1] for histograms in shards_histograms)
+    return np.vstack(
+        [
+            np.pad(histograms, ((0, 0), (0, n_distances - histograms.shape[1])))
+            for histograms in shards_histograms
+        ]
+    )
+
+
+def _get_shard_histograms(
+    sources: np.ndarray,
+    csr_graph: CsrGraph,
+) -> np.ndarray:
+    n_nodes = csr_graph.n_nodes
+    batch_size = max(1, _BFS_BATCH_CELLS // max(n_nodes, 1))
+
+    visited = np.zeros(batch_size * n_nodes, dtype=bool)
+    # Scratch space of `deduplicate`
+    positions = np.empty(batch_size * n_nodes, dtype=np.int64)
+
+    batches_histograms = [
+        _run_bfs_batch(
+            csr_graph,
+            sources[start : start + batch_size],
+            visited,
+            positions,
+        )
+        for start in range(0, sources.size, batch_size)
+    ]
+    if not batches_histograms:
+        return np.zeros((0, 1), dtype=np.int64)
+
+    n_distances = max(histograms.shape[1] for histograms in batches_histograms)
+    return np.vstack(
+        [
+            np.pad(histograms, ((0, 0), (0, n_distances - histograms.shape[1])))
+            for histograms in batches_histograms
+        ]
+    )
+
+
+def _run_bfs_batch(
+    csr_graph: CsrGraph,
+    sources: np.ndarray,
+    visited: np.ndarray,
+    positions: np.ndarray,
+) -> np.ndarray:
+    """Run the BFSs of a batch, counting the nodes of each level per source."""
+    n_nodes = csr_graph.n_nodes
+
+    frontier = np.arange(sources.size) * n_nodes + sources
+    visited[frontier] = True
+    reached = [frontier]
+    levels_sizes: list[np.ndarray] = []
+
+    while frontier.size:
+        levels_sizes.append(np.bincount(frontier // n_nodes, minlength=sources.size))
+
+        _, _, targets = csr_graph.gather_targets(frontier)
+        frontier = deduplicate(targets[~visited[targets]], positions)
+        visited[frontier] = True
+        reached.append(frontier)
+
+    visited[np.concatenate(reached)] = False
+    return np.column_stack(levels_sizes)
+
+
+def _get_shard_bit_parallel_histogram(
+    sources: np.ndarray,
+    csr_graph: CsrGraph,
+) -> np.ndarray:
+    n_words = _BIT_PARALLEL_BATCH_WORDS // max(csr_graph.n_edges, 1)
+    n_words = max(1, min(n_words, -(-sources.size // _WORD_BITS)))
+    batch_size = n_words * _WORD_BITS
+
+    histogram = np.zeros(max(csr_graph.n_nodes, 1), dtype=np.int64)
+    for start in range(0, sources.size, batch_size):
+        levels_sizes = _run_bit_parallel_bfs_batch(
+            csr_graph,
+            sources[start : start + batch_size],
+            n_words,
+        )
+        histogram[: levels_sizes.size] += levels_sizes
+    return histogram
+
+
+def _run_bit_parallel_bfs_batch(
+    csr_graph: CsrGraph,
+    sources: np.ndarray,
+    n_words: int,
+) -> np.ndarray:
+    """Run the BFSs of a batch, counting the nodes of each level of all of them.
+
+    Every node holds `n_words` 64-bit words, the bit `i` being set if the node
+    belongs to the frontier of the BFS from `sources[i]`. A level ORs the words of
+    the neighbors of every node at once, through a reduction over the CSR rows.
+    """
+    n_nodes = csr_graph.n_nodes
+    bit_positions = np.arange(sources.size)
+
+    frontier = np.zeros((n_nodes, n_words), dtype=np.uint64)
+    np.bitwise_or.at(
+        frontier,
+        (sources, bit_positions // _WORD_BITS),
+        np.left_shift(np.uint64(1), (bit_positions % _WORD_BITS).astype(np.uint64)),
+    )
+    visited = frontier.copy()
+
+    # `reduceat` needs non-empty rows, the isolated nodes never get reached anyway
+    rows = np.flatnonzero(csr_graph.degrees)
+    row_starts = csr_graph.indptr[rows]
+
+    levels_sizes: list[int] = []
+    while True:
+        levels_sizes.append(int(np.bitwise_count(frontier).sum()))
+        if not rows.size:
+            break
+
+        reached = np.zeros_like(frontier)
+        reached[rows] = np.bitwise_or.reduceat(
+            frontier[csr_graph.indices],
+            row_starts,
+            axis=0,
+        )
+        frontier = reached & ~visited
+        if not frontier.any():
+            break
+        visited |= frontier
+
+    return np.array(levels_sizes, dtype=np.int64)
+
+
+def get_distances(csr_graph: CsrGraph, source: int) -> np.ndarray:
+    """Run a single BFS from the node with index `source`.
+
+    Returns:
+        The distances of all the nodes from `source`, -1 for the unreachable ones.
+    """
+    distances = np.full(csr_graph.n_nodes, -1, dtype=np.int64)
+    is_visited = np.zeros(csr_graph.n_nodes, dtype=bool)
+    positions = np.empty(csr_graph.n_nodes, dtype=np.int64)
+
+    for distance, level in enumerate(
+        iterate_bfs_levels(csr_graph, source, is_visited, positions)
+    ):
+        distances[level] = distance
+    return distances
+
+
+def iterate_bfs_levels(
+    csr_graph: CsrGraph,
+    source: int,
+    is_visited: np.ndarray,
+    positions: np.ndarray,
+) -> Iterator[np.ndarray]:
+    """Run a single BFS from the node with index `source`, level by level.
+
+    Yields the nodes of each level, starting with `source` alone, so that the
+    caller may stop the BFS early. `is_visited`, all false, and `positions`, the
+    scratch space of `deduplicate`, hold a cell per node. `is_visited` is reset
+    once the BFS is over or the generator is closed, to be reused by the next one.
+    """
+    frontier = np.array([source], dtype=np.int64)
+    is_visited[source] = True
+    reached = [frontier]
+
+    try:
+        while frontier.size:
+            yield frontier
+
+            _, _, targets = csr_graph.gather_targets(frontier)
+            frontier = deduplicate(targets[~is_visited[targets]], positions)
+            is_visited[frontier] = True
+            reached.append(frontier)
+    finally:
+        is_visited[np.concatenate(reached)] = False
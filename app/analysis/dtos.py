@@ -26,12 +26,38 @@ class PathStats(CustomBaseModel):
     path_length_distribution: dict[int, int]
 
 
+class ApproximatePathStats(CustomBaseModel):
+    average_shortest_path_length: float
+    average_shortest_path_length_ci: tuple[float, float]
+    diameter_lower_bound: int
+    path_length_distribution: dict[int, float]
+    path_length_distribution_ci: dict[int, tuple[float, float]]
+    n_sources: int
+
+
+class ExtremalDistancesStats(CustomBaseModel):
+    diameter: int
+    radius: int
+    periphery: list[Any]
+    center: list[Any]
+    n_bfs: int
+
+
 class ClusteringStats(CustomBaseModel):
     global_clustering: float
     average_clustering: float
     density: float
 
 
+class ApproximateClusteringStats(CustomBaseModel):
+    global_clustering: float
+    global_clustering_ci: tuple[float, float]
+    average_clustering: float
+    average_clustering_ci: tuple[float, float]
+    density: float
+    n_wedges: int
+
+
 class CentralityStats(CustomBaseModel):
     eigenvector: dict[Any, float]
     pagerank: dict[Any, float]
@@ -0,0 +1,90 @@
+"""Exact extremal distances computed by bounding the eccentricities."""
+
+import numpy as np
+
+from app.analysis.distances import get_distances
+from app.analysis.dtos import ExtremalDistancesStats
+from app.csr import CsrGraph
+
+
+def get_extremal_distances(csr_graph: CsrGraph) -> ExtremalDistancesStats:
+    """Get the diameter, the radius, the periphery and the center of a graph.
+
+    Follows the bounding eccentricities method of Takes and Kosters. A BFS from a
+    node `v` of eccentricity `e(v)` bounds the eccentricity of every node `w` by
+    `max(d(v, w), e(v) - d(v, w)) <= e(w) <= e(v) + d(v, w)`. The BFSs alternate
+    between the candidates with the largest upper bound and with the smallest
+    lower bound, the first one being a double sweep from the highest degree node.
+    A node stops being a candidate once its eccentricity is known, or once its
+    bounds rule it out of both the periphery and the center. On real-world graphs
+    a few dozen BFSs usually suffice instead of one per node.
+
+    The graph has to be connected.
+    """
+    n_nodes = csr_graph.n_nodes
+    degrees = csr_graph.degrees
+
+    lower_bounds = np.zeros(n_nodes, dtype=np.int64)
+    upper_bounds = np.full(n_nodes, max(n_nodes - 1, 0), dtype=np.int64)
+    candidates = np.ones(n_nodes, dtype=bool)
+
+    n_bfs = 0
+    source = int(np.argmax(degrees)) if n_nodes else None
+    pick_largest_upper_bound = True
+
+    while source is not None:
+        distances = get_distances(csr_graph, source)
+        if np.any(distances < 0):
+            raise ValueError("The graph is not connected")
+        n_bfs += 1
+
+        eccentricity = distances.max()
+        np.maximum(
+            lower_bounds,
+            np.maximum(distances, eccentricity - distances),
+            out=lower_bounds,
+        )
+        np.minimum(upper_bounds, eccentricity + distances, out=upper_bounds)
+
+        diameter_lower_bound = lower_bounds.max()
+        radius_upper_bound = upper_bounds.min()
+        candidates &= (lower_bounds < upper_bounds) & (
+            (upper_bounds >= diameter_lower_bound)
+            | (lower_bounds <= radius_upper_bound)
+        )
+
+        source = _pick_source(
+            candidates,
+            upper_bounds if pick_largest_upper_bound else -lower_bounds,
+            degrees,
+        )
+        pick_largest_upper_bound = not pick_largest_upper_bound
+
+    # Every node left with loose bounds has an eccentricity strictly between the
+    # radius and the diameter, so the extremal nodes all got exact bounds
+    diameter = int(lower_bounds.max()) if n_nodes else 0
+    radius = int(upper_bounds.min()) if n_nodes else 0
+    return ExtremalDistancesStats(
+        diameter=diameter,
+        radius=radius,
+        periphery=[
+            csr_graph.nodes[i] for i in np.flatnonzero(lower_bounds == diameter)
+        ],
+        center=[csr_graph.nodes[i] for i in np.flatnonzero(upper_bounds == radius)],
+        n_bfs=n_bfs,
+    )
+
+
+def _pick_source(
+    candidates: np.ndarray,
+    priorities: np.ndarray,
+    degrees: np.ndarray,
+) -> int | None:
+    """Pick the candidate of the highest priority, breaking ties by degree."""
+    candidate_indices = np.flatnonzero(candidates)
+    if not candidate_indices.size:
+        return None
+
+    candidate_priorities = priorities[candidate_indices]
+    top_indices = candidate_indices[candidate_priorities == candidate_priorities.max()]
+    return int(top_indices[np.argmax(degrees[top_indices])])
@@ -0,0 +1,472 @@
+"""Louvain and Leiden communities detection over a sparse adjacency matrix."""
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.constants import SEED_VALUE
+from app.csr import gather_ranges
+
+# Number of the random classes of nodes moving at once
+_N_NODE_CLASSES = 16
+
+
+def get_communities(
+    adjacency: sp.csr_array,
+    *,
+    refine: bool = True,
+    resolution: float = 1.0,
+    threshold: float = 1.0e-7,
+    seed: int = SEED_VALUE,
+) -> np.ndarray:
+    """Detect the communities maximizing the modularity with Louvain or Leiden.
+
+    The nodes of every level are split into `_N_NODE_CLASSES` random classes.
+    The local moving phase sweeps the classes, and all the nodes of a class get
+    their best neighboring community at once from a sparse node-to-community
+    weights matrix. Of two adjacent nodes of a class willing to move, only the
+    one of the higher random priority does, so the moving nodes do not affect
+    each other's links, only the degree sums of the communities they join, which
+    are kept in NumPy arrays. The phase stops once a sweep gains less than
+    `threshold` modularity. With `refine`, the communities
+    are refined as Leiden does before the aggregation, so that the aggregated
+    nodes are connected. Otherwise, the communities themselves are aggregated,
+    as Louvain does. The aggregation is a sparse product. The adjacency has to be
+    symmetric, its values are the weights of the edges.
+
+    Returns:
+        The community label of every node, from 0 with no gaps.
+    """
+    rng = np.random.default_rng(seed)
+    n_nodes = adjacency.shape[0]
+
+    weights = _get_weights(adjacency)
+    total_weight = float(weights.sum())
+    if not total_weight:
+        return np.arange(n_nodes)
+
+    levels = np.arange(n_nodes)
+    communities = np.arange(n_nodes)
+    while True:
+        n_level_nodes = weights.shape[0]
+        node_classes = np.array_split(
+            rng.permutation(n_level_nodes),
+            min(_N_NODE_CLASSES, n_level_nodes),
+        )
+        priorities = rng.permutation(n_level_nodes)
+
+        communities = _move_nodes(
+            weights,
+            communities,
+            node_classes,
+            priorities,
+            total_weight,
+            resolution,
+            threshold,
+        )
+        groups = (
+            _refine(
+                weights,
+                communities,
+                node_classes,
+                priorities,
+                total_weight,
+                resolution,
+            )
+            if refine
+            else communities
+        )
+        _, groups = np.unique(groups, return_inverse=True)
+        n_groups = int(groups.max()) + 1
+        if n_groups == n_level_nodes:
+            break
+
+        aggregation = sp.csr_array(
+            (np.ones(groups.size), (np.arange(groups.size), groups)),
+            shape=(groups.size, n_groups),
+        )
+        weights = (aggregation.T @ weights @ aggregation).tocsr()
+        levels = groups[levels]
+
+        # The aggregated nodes start in the community of their members
+        group_communities = np.empty(n_groups, dtype=np.int64)
+        group_communities[groups] = communities
+        communities = group_communities
+
+    return communities[levels]
+
+
+def update_frontier_communities(
+    adjacency: sp.csr_array,
+    communities: np.ndarray,
+    changed_nodes: np.ndarray,
+    *,
+    resolution: float = 1.0,
+    threshold: float = 1.0e-7,
+    seed: int = SEED_VALUE,
+) -> np.ndarray:
+    """Update a partition after the edges of `changed_nodes` changed.
+
+    Runs the local moving phase of `get_communities` from `communities`, over the
+    nodes themselves, with no refinement nor aggregation. Only the changed nodes
+    and their neighbors are active at first, and a moved node activates its
+    neighbors, as in the dynamic frontier approach of Sahu et al., so the work
+    stays around the changes.
+
+    Returns:
+        The community label of every node, from 0 with no gaps.
+    """
+    rng = np.random.default_rng(seed)
+    n_nodes = adjacency.shape[0]
+
+    weights = _get_weights(adjacency)
+    total_weight = float(weights.sum())
+    if not total_weight:
+        return np.arange(n_nodes)
+
+    is_active = np.zeros(n_nodes, dtype=bool)
+    is_active[changed_nodes] = True
+    edges, _ = gather_ranges(weights.indptr, changed_nodes)
+    is_active[weights.indices[edges]] = True
+
+    return _move_nodes(
+        weights,
+        communities,
+        np.array_split(rng.permutation(n_nodes), min(_N_NODE_CLASSES, n_nodes)),
+        rng.permutation(n_nodes),
+        total_weight,
+        resolution,
+        threshold,
+        is_active,
+    )
+
+
+def _get_weights(adjacency: sp.csr_array) -> sp.csr_array:
+    """Get the float weights, the self-loops counting twice as in NetworkX."""
+    adjacency = sp.csr_array(adjacency, dtype=np.float64)
+    return (adjacency + sp.diags_array(adjacency.diagonal())).tocsr()
+
+
+def _get_modularity(
+    weights: sp.csr_array,
+    communities: np.ndarray,
+    total_weight: float,
+    resolution: float = 1.0,
+) -> float:
+    """Get the modularity of a partition, the self-loops of `weights` doubled."""
+    rows = np.repeat(np.arange(weights.shape[0]), np.diff(weights.indptr))
+    is_internal = communities[rows] == communities[weights.indices]
+    community_degrees = np.bincount(
+        communities,
+        weights=weights.sum(axis=1),
+        minlength=weights.shape[0],
+    )
+    return float(
+        weights.data[is_internal].sum() / total_weight
+        - resolution * np.square(community_degrees / total_weight).sum()
+    )
+
+
+def _move_nodes(
+    weights: sp.csr_array,
+    communities: np.ndarray,
+    node_classes: list[np.ndarray],
+    priorities: np.ndarray,
+    total_weight: float,
+    resolution: float,
+    threshold: float,
+    is_active: np.ndarray | None = None,
+) -> np.ndarray:
+    """Move the nodes to their best neighboring communities until it stalls.
+
+    The classes are swept in turn, all the nodes of a class moving at once. A
+    node losing in every neighboring community moves to an empty one, as in
+    Leiden. With `is_active`, only the active nodes are visited: a visited node
+    gets inactive, and the neighbors of a moved one get active.
+    """
+    n_nodes = weights.shape[0]
+    degrees = weights.sum(axis=1)
+    degree_scale = resolution / total_weight
+
+    _, communities = np.unique(communities, return_inverse=True)
+    community_sizes = np.bincount(communities, minlength=n_nodes)
+    community_degrees = np.bincount(communities, weights=degrees, minlength=n_nodes)
+    modularity = _get_modularity(weights, communities, total_weight, resolution)
+    while is_active is None or is_active.any():
+        for node_class in node_classes:
+            nodes = node_class
+            if is_active is not None:
+                nodes = node_class[is_active[node_class]]
+                is_active[nodes] = False
+
+            # The node itself does not count in the degree of its community
+            stay_gains = (
+                -degree_scale
+                * degrees[nodes]
+                * (community_degrees[communities[nodes]] - degrees[nodes])
+            )
+            movers, targets = _get_best_moves(
+                _get_class_links(weights, nodes, communities),
+                stay_gains,
+                communities[nodes],
+                degrees[nodes],
+                community_degrees,
+                degree_scale,
+                isolate=True,
+            )
+            is_kept = _is_kept_move(weights, nodes[movers], priorities)
+            movers, targets = _assign_empty_communities(
+                nodes[movers[is_kept]],
+                targets[is_kept],
+                community_sizes,
+            )
+            community_sizes -= np.bincount(communities[movers], minlength=n_nodes)
+            community_sizes += np.bincount(targets, minlength=n_nodes)
+            community_degrees -= np.bincount(
+                communities[movers],
+                weights=degrees[movers],
+                minlength=n_nodes,
+            )
+            community_degrees += np.bincount(
+                targets,
+                weights=degrees[movers],
+                minlength=n_nodes,
+            )
+            communities[movers] = targets
+
+            if is_active is not None:
+                edges, _ = gather_ranges(weights.indptr, movers)
+                is_active[weights.indices[edges]] = True
+
+        previous_modularity = modularity
+        modularity = _get_modularity(weights, communities, total_weight, resolution)
+        if modularity - previous_modularity < threshold:
+            break
+
+    _, communities = np.unique(communities, return_inverse=True)
+    return communities
+
+
+def _assign_empty_communities(
+    movers: np.ndarray,
+    targets: np.ndarray,
+    community_sizes: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Give the empty communities to the movers to -1, the extra movers stay."""
+    is_isolated = targets < 0
+    empty_communities = np.flatnonzero(community_sizes == 0)
+    isolated = np.flatnonzero(is_isolated)[: empty_communities.size]
+
+    targets = targets.copy()
+    targets[isolated] = empty_communities[: isolated.size]
+    is_moving = ~is_isolated
+    is_moving[isolated] = True
+    return movers[is_moving], targets[is_moving]
+
+
+def _refine(
+    weights: sp.csr_array,
+    communities: np.ndarray,
+    node_classes: list[np.ndarray],
+    priorities: np.ndarray,
+    total_weight: float,
+    resolution: float,
+) -> np.ndarray:
+    """Split the communities into well-connected groups, as Leiden does.
+
+    Every node starts alone and is visited once, class by class, the adjacent
+    nodes of a class being left alone but for the one of the highest priority. A
+    node still alone and well connected to its community joins the group of the
+    best modularity gain, if not negative, among the groups of its community that
+    are well connected to it. Leiden draws the group at random, the best one is
+    taken here. A node only joins the group of a neighbor, so the groups stay
+    connected.
+
+    Returns:
+        The group of every node, labeled by one of its members.
+    """
+    n_nodes = weights.shape[0]
+    degrees = weights.sum(axis=1)
+    degree_scale = resolution / total_weight
+    rows, cols, data = _get_links(weights)
+
+    # Only the links within a community matter
+    is_internal = communities[rows] == communities[cols]
+    rows, cols, data = rows[is_internal], cols[is_internal], data[is_internal]
+    internal_weights = sp.csr_array(
+        (data, (rows, cols)),
+        shape=(n_nodes, n_nodes),
+    )
+
+    community_degrees = np.bincount(communities, weights=degrees, minlength=n_nodes)
+    node_internal_weights = np.bincount(rows, weights=data, minlength=n_nodes)
+    is_well_connected = node_internal_weights >= degree_scale * degrees * (
+        community_degrees[communities] - degrees
+    )
+
+    groups = np.arange(n_nodes)
+    group_sizes = np.ones(n_nodes, dtype=np.int64)
+    group_degrees = degrees.copy()
+    # Weights of the links from the groups to the rest of their community
+    group_external_weights = node_internal_weights.copy()
+
+    for node_class in node_classes:
+        nodes = node_class[
+            is_well_connected[node_class] & (group_sizes[groups[node_class]] == 1)
+        ]
+
+        # A group label is one of its members, so it tells the community
+        is_target = group_external_weights >= degree_scale * group_degrees * (
+            community_degrees[communities] - group_degrees
+        )
+        links = _get_class_links(internal_weights, nodes, groups)
+        links.data[~is_target[links.indices]] = 0
+        links.eliminate_zeros()
+
+        movers, targets = _get_best_moves(
+            links,
+            np.zeros(nodes.size, dtype=np.float64),
+            groups[nodes],
+            degrees[nodes],
+            group_degrees,
+            degree_scale,
+            strict=False,
+        )
+        is_kept = _is_kept_move(internal_weights, nodes[movers], priorities)
+        movers, targets = nodes[movers[is_kept]], targets[is_kept]
+
+        # The links of a mover to its new group become internal to the group
+        mover_links = _get_class_links(internal_weights, movers, groups)
+        mover_rows = np.repeat(np.arange(movers.size), np.diff(mover_links.indptr))
+        is_joined = mover_links.indices == targets[mover_rows]
+        joined_weights = np.bincount(
+            mover_rows[is_joined],
+            weights=mover_links.data[is_joined],
+            minlength=movers.size,
+        )
+        np.add.at(
+            group_external_weights,
+            targets,
+            node_internal_weights[movers] - 2 * joined_weights,
+        )
+        np.add.at(group_degrees, targets, degrees[movers])
+        np.add.at(group_sizes, targets, 1)
+        group_sizes[movers] = 0
+        group_degrees[movers] = 0
+        group_external_weights[movers] = 0
+        groups[movers] = targets
+
+    return groups
+
+
+def _is_kept_move(
+    weights: sp.csr_array,
+    movers: np.ndarray,
+    priorities: np.ndarray,
+) -> np.ndarray:
+    """Tell the movers with no adjacent mover of a higher priority."""
+    is_mover = np.zeros(weights.shape[0], dtype=bool)
+    is_mover[movers] = True
+
+    edges, counts = gather_ranges(weights.indptr, movers)
+    rows = np.repeat(np.arange(movers.size), counts)
+    neighbors = weights.indices[edges]
+    is_overridden = is_mover[neighbors] & (
+        priorities[neighbors] > priorities[movers[rows]]
+    )
+    return np.bincount(rows[is_overridden], minlength=movers.size) == 0
+
+
+def _get_class_links(
+    weights: sp.csr_array,
+    nodes: np.ndarray,
+    labels: np.ndarray,
+) -> sp.csr_array:
+    """Get the weights from `nodes` to the labels of their neighbors, loops aside."""
+    edges, counts = gather_ranges(weights.indptr, nodes)
+    rows = np.repeat(np.arange(nodes.size), counts)
+    cols = weights.indices[edges]
+    is_link = nodes[rows] != cols
+    return sp.csr_array(
+        (weights.data[edges][is_link], (rows[is_link], labels[cols[is_link]])),
+        shape=(nodes.size, labels.size),
+    )
+
+
+def _get_links(weights: sp.csr_array) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get the rows, the columns and the weights of the non-loop entries."""
+    rows = np.repeat(np.arange(weights.shape[0]), np.diff(weights.indptr))
+    is_link = rows != weights.indices
+    return rows[is_link], weights.indices[is_link], weights.data[is_link]
+
+
+def _get_best_moves(
+    links: sp.csr_array,
+    stay_gains: np.ndarray,
+    labels: np.ndarray,
+    degrees: np.ndarray,
+    label_degrees: np.ndarray,
+    degree_scale: float,
+    *,
+    strict: bool = True,
+    isolate: bool = False,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get the nodes gaining by joining another label, and their best labels.
+
+    `links` holds the weights from the nodes to the labels. The gain of joining a
+    label is the weight to it minus `degree_scale` times the degrees of the node
+    and of the label. The gain of the own label is the weight to it plus
+    `stay_gains`, and the moves have to beat it, or to match it if not `strict`.
+    The ties are broken by the lowest label. The nodes joining the same label are
+    taken by decreasing gain, each one seeing the degrees of the previous ones
+    added to the label, as if they had moved one by one. With `isolate`, the
+    nodes that would lose anywhere move to an empty label instead, given as -1.
+    """
+    link_rows = np.repeat(np.arange(links.shape[0]), np.diff(links.indptr))
+    gains = (
+        links.data - degree_scale * degrees[link_rows] * label_degrees[links.indices]
+    )
+    is_own = links.indices == labels[link_rows]
+    stay_gains = stay_gains.copy()
+    stay_gains[link_rows[is_own]] += links.data[is_own]
+    gains[is_own] = stay_gains[link_rows[is_own]]
+
+    # The labels of a row are sorted, so the first best one is the lowest
+    counts = np.diff(links.indptr)
+    row_starts = links.indptr[:-1][counts > 0]
+    row_best_gains = (
+        np.maximum.reduceat(gains, row_starts) if gains.size else np.empty(0)
+    )
+    best = np.flatnonzero(gains == np.repeat(row_best_gains, counts[counts > 0]))
+    is_first = np.ones(best.size, dtype=bool)
+    is_first[1:] = link_rows[best[1:]] != link_rows[best[:-1]]
+    best = best[is_first]
+    best = best[links.indices[best] != labels[link_rows[best]]]
+
+    movers, targets, best_gains = link_rows[best], links.indices[best], gains[best]
+    order = np.lexsort((-best_gains, targets))
+    movers, targets, best_gains = movers[order], targets[order], best_gains[order]
+
+    mover_degrees = degrees[movers]
+    preceding_degrees = np.cumsum(mover_degrees) - mover_degrees
+    is_first = np.ones(targets.size, dtype=bool)
+    is_first[1:] = targets[1:] != targets[:-1]
+    preceding_degrees -= np.maximum.accumulate(np.where(is_first, preceding_degrees, 0))
+    best_gains -= degree_scale * mover_degrees * preceding_degrees
+
+    is_better = (
+        best_gains > stay_gains[movers] if strict else best_gains >= stay_gains[movers]
+    )
+    movers, targets = movers[is_better], targets[is_better]
+    if not isolate:
+        return movers, targets
+
+    # Joining an empty label gains nothing, which beats losing
+    max_gains = stay_gains.copy()
+    max_gains[counts > 0] = np.maximum(max_gains[counts > 0], row_best_gains)
+    is_isolated = max_gains < 0
+    is_joining = ~is_isolated[movers]
+    isolated = np.flatnonzero(is_isolated)
+    return (
+        np.concatenate((movers[is_joining], isolated)),
+        np.concatenate((targets[is_joining], np.full(isolated.size, -1))),
+    )
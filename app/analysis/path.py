@@ -5,81 +5,200 @@ import networkx as nx
 import numpy as np
 import seaborn as sns
 import structlog
+from scipy.sparse.csgraph import connected_components
 
-from app.analysis.dtos import PathStats
+from app.analysis.distances import (
+    get_distances_histogram,
+    get_sources_distances_histograms,
+)
+from app.analysis.dtos import ApproximatePathStats, PathStats
+from app.analysis.eccentricity import get_extremal_distances
+from app.configs import get_configs
+from app.constants import CONFIDENCE_Z, SEED_VALUE
+from app.csr import CsrGraph, to_csr_graph
 from app.visualize import process_plot
+from app.vos import BfsEngine
 
 
 def calculate_path_analysis(
     graph: nx.Graph,
     graph_name: str | None = None,
+    n_workers: int | None = 1,
+    *,
+    with_distribution: bool = True,
 ) -> list[Path]:
+    """Analyze the shortest path lengths of every connected component.
+
+    The components are labeled once, and the nodes of the CSR graph are reordered
+    so that each component is a contiguous block analyzed in place. Components
+    smaller than `ANALYSIS_PATHS_MIN_COMPONENT_N_NODES` are analyzed together,
+    into a single aggregate histogram, and are not plotted.
+
+    The BFSs run in `n_workers` processes (`None` for all the CPUs), which does
+    not affect the result. The exact analysis uses the `ANALYSIS_BFS_ENGINE`.
+    Components larger than `ANALYSIS_APPROXIMATE_PATHS_N_NODES` are analyzed
+    approximately, by running BFSs from sampled sources only.
+
+    Without `with_distribution`, only the exact extremal distances of the
+    components that are not small are computed, which usually takes a few dozen
+    BFSs, the small components are skipped and nothing is plotted.
+    """
+    configs = get_configs()
     logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
-    if nx.is_connected(graph):
-        visualization_image_file_paths = [_calculate_path_analysis(graph, graph_name)]
-    else:
-        visualization_image_file_paths = []
+    csr_graph = to_csr_graph(graph)
+    n_components, labels = connected_components(csr_graph.to_scipy(), directed=False)
+    sizes = np.bincount(labels, minlength=n_components)
 
-        for component_num, component_set in enumerate(nx.connected_components(graph)):
-            component = graph.subgraph(component_set).copy()
+    is_small = sizes < configs.ANALYSIS_PATHS_MIN_COMPONENT_N_NODES
+    if n_components == 1:
+        is_small[:] = False
 
-            visualization_image_file_path = _calculate_path_analysis(
-                component,
-                graph_name,
-                component_num,
-            )
+    # The small components go last, the others keep their order
+    order = np.lexsort((labels, is_small[labels]))
+    csr_graph = csr_graph.permute(order)
+
+    visualization_image_file_paths = []
+    start = 0
+    for component_num in np.flatnonzero(~is_small).tolist():
+        stop = start + int(sizes[component_num])
+        visualization_image_file_path = _calculate_path_analysis(
+            csr_graph.get_block(start, stop),
+            graph_name,
+            component_num if n_components > 1 else None,
+            n_workers,
+            with_distribution=with_distribution,
+        )
+        if visualization_image_file_path is not None:
             visualization_image_file_paths.append(visualization_image_file_path)
+        start = stop
 
-    logger.info(
-        "Shortest Path Length Distribution visualization",
-        image_file_paths=visualization_image_file_paths,
-    )
+    if with_distribution and is_small.any():
+        analysis_to = _analyze_component(
+            csr_graph.get_block(start, csr_graph.n_nodes),
+            n_workers,
+            configs.ANALYSIS_BFS_ENGINE,
+        )
+        logger.info(
+            "Path analysis of the small components",
+            graph_name=graph_name,
+            n_components=int(np.count_nonzero(is_small)),
+            n_nodes=csr_graph.n_nodes - start,
+            average_shortest_path_length=analysis_to.average_shortest_path_length,
+            diameter=analysis_to.diameter,
+        )
+
+    if visualization_image_file_paths:
+        logger.info(
+            "Shortest Path Length Distribution visualization",
+            image_file_paths=visualization_image_file_paths,
+        )
     return visualization_image_file_paths
 
 
 def _calculate_path_analysis(
-    graph: nx.Graph,
+    csr_graph: CsrGraph,
     graph_name: str | None = None,
     component_num: int | None = None,
-) -> Path:
-    analysis_to = _analyze_component(graph)
-    visualization_image_file_path = _visualize_path_length_distribution(
-        analysis_to.path_length_distribution,
+    n_workers: int | None = 1,
+    *,
+    with_distribution: bool = True,
+) -> Path | None:
+    configs = get_configs()
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    if not with_distribution:
+        extremal_distances_to = get_extremal_distances(csr_graph)
+        logger.info(
+            "Extremal distances",
+            graph_name=graph_name,
+            component_num=component_num,
+            diameter=extremal_distances_to.diameter,
+            radius=extremal_distances_to.radius,
+            periphery_size=len(extremal_distances_to.periphery),
+            center_size=len(extremal_distances_to.center),
+            n_bfs=extremal_distances_to.n_bfs,
+        )
+        return None
+
+    if csr_graph.n_nodes > configs.ANALYSIS_APPROXIMATE_PATHS_N_NODES:
+        approximation_to = _approximate_component(
+            csr_graph,
+            configs.ANALYSIS_PATHS_N_SOURCES,
+            n_workers,
+        )
+        distribution = approximation_to.path_length_distribution
+        distribution_ci = approximation_to.path_length_distribution_ci
+        logger.info(
+            "Approximate path analysis",
+            graph_name=graph_name,
+            component_num=component_num,
+            n_sources=approximation_to.n_sources,
+            average_shortest_path_length=(
+                approximation_to.average_shortest_path_length
+            ),
+            average_shortest_path_length_ci=(
+                approximation_to.average_shortest_path_length_ci
+            ),
+            diameter_lower_bound=approximation_to.diameter_lower_bound,
+            path_length_distribution=distribution,
+            path_length_distribution_ci=distribution_ci,
+        )
+    else:
+        analysis_to = _analyze_component(
+            csr_graph,
+            n_workers,
+            configs.ANALYSIS_BFS_ENGINE,
+        )
+        distribution = analysis_to.path_length_distribution
+        distribution_ci = None
+        logger.info(
+            "Path analysis",
+            graph_name=graph_name,
+            component_num=component_num,
+            average_shortest_path_length=analysis_to.average_shortest_path_length,
+            diameter=analysis_to.diameter,
+        )
+
+    return _visualize_path_length_distribution(
+        distribution,
         graph_name,
         component_num,
+        distribution_ci,
     )
 
-    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
-    logger.info(
-        "Path analysis",
-        graph_name=graph_name,
-        component_num=component_num,
-        average_shortest_path_length=analysis_to.average_shortest_path_length,
-        diameter=analysis_to.diameter,
-    )
 
-    return visualization_image_file_path
+def _analyze_component(
+    csr_graph: CsrGraph,
+    n_workers: int | None = 1,
+    engine: BfsEngine = BfsEngine.BATCHED,
+) -> PathStats:
+    """Analyze the path lengths of a graph in a single BFS pass.
+
+    For a disconnected graph, only the pairs within a component are accounted for.
+    """
+    histogram = get_distances_histogram(
+        csr_graph,
+        n_workers=n_workers,
+        engine=engine,
+    )
+    return _get_path_stats(histogram)
 
 
-def _analyze_component(graph: nx.Graph) -> PathStats:
-    avg_length = nx.average_shortest_path_length(graph)
-    diameter = nx.diameter(graph)
+def _get_path_stats(histogram: np.ndarray) -> PathStats:
+    """Derive the path statistics from the histogram of the ordered pairs."""
+    lengths = np.flatnonzero(histogram[1:]) + 1
+    counts = histogram[lengths]
 
-    distances = [
-        distance
-        for src_node, lengths in nx.all_pairs_shortest_path_length(graph)
-        for tgt_node, distance in lengths.items()
-        if src_node != tgt_node
-    ]
-    distances = np.array(distances)
+    n_pairs = int(counts.sum())
+    avg_length = float(lengths @ counts) / n_pairs if n_pairs else 0.0
+    diameter = int(lengths[-1]) if lengths.size else 0
 
-    unique_lengths, counts = np.unique(distances, return_counts=True)
     distribution: dict[int, int] = dict(
         zip(
-            unique_lengths.tolist(),
+            lengths.tolist(),
             (counts // 2).tolist(),
-            strict=False,
+            strict=True,
         )
     )
 
@@ -90,17 +209,98 @@ def _analyze_component(graph: nx.Graph) -> PathStats:
     )
 
 
+def _approximate_component(
+    csr_graph: CsrGraph,
+    n_sources: int,
+    n_workers: int | None = 1,
+) -> ApproximatePathStats:
+    """Estimate the path lengths of a connected graph from sampled sources.
+
+    The sources are sampled uniformly without replacement, so the mean over the
+    sources of the fraction of nodes at a distance is an unbiased estimate of the
+    fraction of pairs at that distance. The 95% confidence intervals account for
+    the finite population. The largest sampled eccentricity is a lower bound of
+    the diameter.
+    """
+    n_nodes = csr_graph.n_nodes
+
+    rng = np.random.default_rng(SEED_VALUE)
+    sources = np.sort(rng.choice(n_nodes, size=min(n_sources, n_nodes), replace=False))
+    histograms = get_sources_distances_histograms(csr_graph, sources, n_workers)
+
+    # Fractions of the other nodes at each distance, per source
+    fractions = histograms[:, 1:] / max(n_nodes - 1, 1)
+    lengths = np.arange(1, histograms.shape[1])
+
+    averages = fractions @ lengths
+    average, average_half_width = _get_mean_and_half_width(averages, n_nodes)
+    means, half_widths = _get_mean_and_half_width(fractions, n_nodes)
+
+    n_pairs = n_nodes * (n_nodes - 1) / 2
+    return ApproximatePathStats(
+        average_shortest_path_length=average,
+        average_shortest_path_length_ci=(
+            average - average_half_width,
+            average + average_half_width,
+        ),
+        diameter_lower_bound=int(lengths[-1]) if lengths.size else 0,
+        path_length_distribution=dict(
+            zip(lengths.tolist(), (means * n_pairs).tolist(), strict=True)
+        ),
+        path_length_distribution_ci={
+            length: (max(low, 0.0) * n_pairs, high * n_pairs)
+            for length, low, high in zip(
+                lengths.tolist(),
+                (means - half_widths).tolist(),
+                (means + half_widths).tolist(),
+                strict=True,
+            )
+        },
+        n_sources=int(sources.size),
+    )
+
+
+def _get_mean_and_half_width(
+    samples: np.ndarray,
+    population_size: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get the mean of `samples` along the first axis and its 95% CI half-width."""
+    n_samples = samples.shape[0]
+    mean = samples.mean(axis=0)
+    if n_samples < 2:  # noqa: PLR2004
+        return mean, np.zeros_like(mean)
+
+    finite_population_correction = (population_size - n_samples) / max(
+        population_size - 1, 1
+    )
+    standard_error = np.sqrt(
+        samples.var(axis=0, ddof=1) / n_samples * finite_population_correction
+    )
+    return mean, CONFIDENCE_Z * standard_error
+
+
 def _visualize_path_length_distribution(
-    distribution: dict[int, int],
+    distribution: dict[int, float],
     graph_name: str | None = None,
     component_num: int | None = None,
+    distribution_ci: dict[int, tuple[float, float]] | None = None,
 ) -> Path:
+    """Plot the distribution, with the confidence intervals as error bars if any."""
     lengths = np.array(list(distribution.keys()))
     frequencies = np.array(list(distribution.values()))
 
     plt.figure(figsize=(16, 10))
 
     ax = sns.scatterplot(x=lengths, y=frequencies)
+    if distribution_ci is not None:
+        lows, highs = np.array([distribution_ci[length] for length in lengths]).T
+        ax.errorbar(
+            lengths,
+            frequencies,
+            yerr=(frequencies - lows, highs - frequencies),
+            fmt="none",
+            capsize=4,
+        )
     ax.set_yscale("log")
 
     title = "Shortest Path Length Distribution"
@@ -0,0 +1,153 @@
+"""Spectral centralities solved over a single sparse adjacency matrix."""
+
+from typing import Any, NamedTuple
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as sla
+
+from app.csr import CsrGraph
+
+
+class SpectralCentralities(NamedTuple):
+    """Centralities of the nodes, aligned with `CsrGraph.nodes`."""
+
+    eigenvector: np.ndarray
+    pagerank: np.ndarray
+    katz: np.ndarray
+
+
+def get_spectral_centralities(
+    csr_graph: CsrGraph,
+    katz_alpha: float = 0.1,
+    katz_beta: float = 1.0,
+    weighted_adjacency: sp.csr_array | None = None,
+) -> SpectralCentralities:
+    """Get the eigenvector, PageRank and Katz centralities of the nodes.
+
+    The adjacency is built once and shared by the eigenvector and Katz solvers,
+    whose edges are unweighted as in NetworkX by default. PageRank runs over
+    `weighted_adjacency`, see `get_weighted_adjacency`, since `nx.pagerank` reads
+    the weights by default, or over the unweighted adjacency if it is not given.
+    The values are normalized as in NetworkX.
+    """
+    adjacency = csr_graph.to_scipy()
+    is_symmetric = (adjacency != adjacency.T).nnz == 0
+
+    return SpectralCentralities(
+        eigenvector=get_eigenvector_centrality(adjacency, is_symmetric=is_symmetric),
+        pagerank=get_pagerank(
+            adjacency if weighted_adjacency is None else weighted_adjacency
+        ),
+        katz=get_katz_centrality(
+            adjacency,
+            katz_alpha,
+            katz_beta,
+            is_symmetric=is_symmetric,
+        ),
+    )
+
+
+def get_eigenvector_centrality(
+    adjacency: sp.csr_array,
+    *,
+    is_symmetric: bool = True,
+) -> np.ndarray:
+    """Compute the eigenvector centrality with ARPACK.
+
+    Gets the leading left eigenvector of the adjacency, with `eigsh` for
+    undirected graphs, scaled to a unit Euclidean norm and a positive sum.
+    """
+    n_nodes = adjacency.shape[0]
+    if n_nodes == 1:
+        return np.ones(1)
+
+    start_vector = np.ones(n_nodes)
+    if is_symmetric:
+        _, vectors = sla.eigsh(adjacency, k=1, which="LA", v0=start_vector)
+    else:
+        _, vectors = sla.eigs(adjacency.T, k=1, which="LR", v0=start_vector)
+
+    centrality = vectors[:, 0].real
+    return centrality / (np.sign(centrality.sum()) * np.linalg.norm(centrality))
+
+
+def get_pagerank(
+    adjacency: sp.csr_array,
+    alpha: float = 0.85,
+    max_iter: int = 100,
+    tol: float = 1.0e-6,
+) -> np.ndarray:
+    """Compute PageRank by power iteration over the sparse adjacency.
+
+    Follows `nx.pagerank`: the rank of a node is split among its edges in
+    proportion to their weights, the values of `adjacency`, the rank of dangling
+    nodes is spread uniformly and the iteration stops once the L1 change is below
+    `n_nodes * tol`.
+    """
+    n_nodes = adjacency.shape[0]
+
+    out_weights = adjacency.sum(axis=1)
+    inverse_out_weights = np.divide(
+        1.0,
+        out_weights,
+        out=np.zeros(n_nodes, dtype=np.float64),
+        where=out_weights != 0,
+    )
+    is_dangling = out_weights == 0
+
+    ranks = np.full(n_nodes, 1.0 / n_nodes)
+    for _ in range(max_iter):
+        previous_ranks = ranks
+        ranks = alpha * ((ranks * inverse_out_weights) @ adjacency)
+        ranks += (alpha * previous_ranks[is_dangling].sum() + 1 - alpha) / n_nodes
+        if np.abs(ranks - previous_ranks).sum() < n_nodes * tol:
+            break
+    return ranks
+
+
+def get_katz_centrality(
+    adjacency: sp.csr_array,
+    alpha: float = 0.1,
+    beta: float = 1.0,
+    *,
+    is_symmetric: bool = True,
+) -> np.ndarray:
+    """Compute the Katz centrality by solving `(I - alpha * A^T) x = beta`.
+
+    The system is symmetric positive definite for undirected graphs when `alpha`
+    is below the inverse of the largest eigenvalue, so conjugate gradients solve
+    it. Directed graphs get a sparse direct solve. The result is scaled to a unit
+    Euclidean norm, as `nx.katz_centrality` does.
+    """
+    n_nodes = adjacency.shape[0]
+    system = sp.identity(n_nodes, format="csr") - alpha * adjacency.T
+    right_hand_side = np.full(n_nodes, beta, dtype=np.float64)
+
+    if is_symmetric:
+        centrality, info = sla.cg(system, right_hand_side, rtol=1.0e-12)
+        if info != 0:
+            raise ValueError("Katz centrality did not converge, `alpha` is too large")
+    else:
+        centrality = sla.spsolve(system.tocsc(), right_hand_side)
+
+    return centrality / (np.sign(centrality.sum()) * np.linalg.norm(centrality))
+
+
+def get_weighted_adjacency(graph: nx.Graph, csr_graph: CsrGraph) -> sp.csr_array:
+    """Get the adjacency weighted by the `weight` edge attribute, 1 by default.
+
+    The rows and the columns are aligned with `csr_graph.nodes`.
+    """
+    return nx.to_scipy_sparse_array(
+        graph,
+        nodelist=csr_graph.nodes,
+        weight="weight",
+        format="csr",
+    )
+
+
+def to_nodes_values(csr_graph: CsrGraph, values: np.ndarray) -> dict[Any, float]:
+    """Map the values aligned with `csr_graph.nodes` back to the nodes."""
+    return dict(zip(csr_graph.nodes, values.tolist(), strict=True))
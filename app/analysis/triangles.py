@@ -0,0 +1,225 @@
+"""Triangle counting over a degree-ordered orientation of a CSR graph."""
+
+from functools import partial
+from typing import NamedTuple
+
+import numpy as np
+
+from app.constants import CONFIDENCE_Z, SEED_VALUE
+from app.csr import CsrGraph
+
+# Upper bound of the number of wedges checked at once
+_WEDGES_BATCH_SIZE = 1 << 22
+
+# Number of the wedges sampled per node for its local clustering estimate
+_WEDGES_PER_SAMPLED_NODE = 100
+
+
+class TriangleCounts(NamedTuple):
+    """Numbers of triangles and of wedges per node, aligned with `CsrGraph.nodes`.
+
+    A wedge is a pair of neighbors of the node, a closed one being a triangle.
+    """
+
+    triangles: np.ndarray
+    wedges: np.ndarray
+
+    def get_clustering(self) -> np.ndarray:
+        """Get the local clustering coefficient of every node, 0 without wedges."""
+        return np.divide(
+            self.triangles,
+            self.wedges,
+            out=np.zeros(self.wedges.size, dtype=np.float64),
+            where=self.wedges > 0,
+        )
+
+    def get_average_clustering(self) -> float:
+        return float(self.get_clustering().mean()) if self.wedges.size else 0.0
+
+    def get_transitivity(self) -> float:
+        """Get the fraction of the closed wedges of the whole graph."""
+        n_wedges = int(self.wedges.sum())
+        return float(self.triangles.sum() / n_wedges) if n_wedges else 0.0
+
+
+class ClusteringEstimates(NamedTuple):
+    """Clustering estimated from sampled wedges, with 95% CI half-widths."""
+
+    transitivity: float
+    transitivity_half_width: float
+    average_clustering: float
+    average_clustering_half_width: float
+    sampled_clustering: np.ndarray
+    n_samples: int
+
+
+def count_triangles(csr_graph: CsrGraph) -> TriangleCounts:
+    """Count the triangles of every node of an undirected graph in a single pass.
+
+    Every edge is oriented from its endpoint of the lower degree, ties broken by
+    the index, so the out-degrees stay below the square root of the number of
+    edges even for hubs. A triangle is then found exactly once, as a pair of
+    out-neighbors of its lowest node joined by an edge. The pairs are checked in
+    batches against the sorted keys of the oriented edges. Self-loops are
+    ignored, as NetworkX does.
+    """
+    n_nodes = csr_graph.n_nodes
+    rows = np.repeat(np.arange(n_nodes), csr_graph.degrees)
+    cols = csr_graph.indices
+
+    is_loop = rows == cols
+    degrees = np.bincount(rows[~is_loop], minlength=n_nodes)
+    ranks = np.empty(n_nodes, dtype=np.int64)
+    ranks[np.argsort(degrees, kind="stable")] = np.arange(n_nodes)
+
+    # The CSR order is kept, so the oriented edges stay grouped by row
+    is_out = ranks[rows] < ranks[cols]
+    out_rows, out_cols = rows[is_out], cols[is_out]
+    out_indptr = np.concatenate(
+        ([0], np.cumsum(np.bincount(out_rows, minlength=n_nodes)))
+    )
+    edge_keys = np.sort(out_rows * n_nodes + out_cols)
+
+    # Every out-edge pairs with the following out-edges of its row
+    n_out_edges = out_rows.size
+    row_ends = out_indptr[out_rows + 1]
+    n_pairs = row_ends - np.arange(n_out_edges) - 1
+
+    cumulative_n_pairs = np.cumsum(n_pairs)
+
+    triangles = np.zeros(n_nodes, dtype=np.int64)
+    start = 0
+    while start < n_out_edges:
+        n_done = cumulative_n_pairs[start - 1] if start else 0
+        end = np.searchsorted(
+            cumulative_n_pairs,
+            n_done + _WEDGES_BATCH_SIZE,
+            side="right",
+        )
+        end = max(int(end), start + 1)
+
+        counts = n_pairs[start:end]
+        offsets = np.cumsum(counts) - counts
+        firsts = np.repeat(np.arange(start, end), counts)
+        seconds = np.arange(int(counts.sum())) + np.repeat(
+            np.arange(start, end) + 1 - offsets,
+            counts,
+        )
+        start = end
+
+        centers, ends_1, ends_2 = out_rows[firsts], out_cols[firsts], out_cols[seconds]
+        lows = np.where(ranks[ends_1] < ranks[ends_2], ends_1, ends_2)
+        keys = lows * n_nodes + (ends_1 + ends_2 - lows)
+
+        found = np.minimum(np.searchsorted(edge_keys, keys), edge_keys.size - 1)
+        is_closed = edge_keys[found] == keys
+        for corners in (centers, ends_1, ends_2):
+            triangles += np.bincount(corners[is_closed], minlength=n_nodes)
+
+    return TriangleCounts(
+        triangles=triangles,
+        wedges=degrees * (degrees - 1) // 2,
+    )
+
+
+def estimate_clustering(
+    csr_graph: CsrGraph,
+    n_samples: int,
+    seed: int = SEED_VALUE,
+) -> ClusteringEstimates:
+    """Estimate the clustering of an undirected graph by uniform wedge sampling.
+
+    The transitivity is the fraction of closed wedges among `n_samples` wedges
+    drawn uniformly, i.e. from centers drawn proportionally to their number of
+    wedges. The average clustering is the fraction of closed wedges among
+    `n_samples` wedges drawn from uniform centers, the centers without wedges
+    counting as open. Both are means of Bernoulli draws, hence the normal
+    confidence intervals. The local clustering of the nodes is estimated for a
+    uniform sample of them only, with `_WEDGES_PER_SAMPLED_NODE` wedges each.
+    The cost does not depend on the degrees of the hubs.
+    """
+    n_nodes = csr_graph.n_nodes
+    rng = np.random.default_rng(seed)
+
+    rows = np.repeat(np.arange(n_nodes), csr_graph.degrees)
+    is_loop = rows == csr_graph.indices
+    indptr = np.concatenate(
+        ([0], np.cumsum(np.bincount(rows[~is_loop], minlength=n_nodes)))
+    )
+    indices = csr_graph.indices[~is_loop]
+    edge_keys = np.sort(rows[~is_loop] * n_nodes + indices)
+    draw_closed_wedges = partial(_draw_closed_wedges, indptr, indices, edge_keys, rng)
+
+    degrees = np.diff(indptr)
+    wedges = degrees * (degrees - 1) // 2
+    n_wedges = int(wedges.sum())
+
+    if n_samples <= 0 or not n_wedges:
+        return ClusteringEstimates(
+            transitivity=0.0,
+            transitivity_half_width=0.0,
+            average_clustering=0.0,
+            average_clustering_half_width=0.0,
+            sampled_clustering=np.zeros(0, dtype=np.float64),
+            n_samples=0,
+        )
+
+    transitivity_centers = rng.choice(n_nodes, size=n_samples, p=wedges / n_wedges)
+    transitivity = float(draw_closed_wedges(transitivity_centers).mean())
+    average_clustering_centers = rng.integers(n_nodes, size=n_samples)
+    average_clustering = float(draw_closed_wedges(average_clustering_centers).mean())
+
+    n_sampled_nodes = min(n_nodes, max(1, n_samples // _WEDGES_PER_SAMPLED_NODE))
+    sampled_nodes = rng.choice(n_nodes, size=n_sampled_nodes, replace=False)
+    sampled_clustering = (
+        draw_closed_wedges(np.repeat(sampled_nodes, _WEDGES_PER_SAMPLED_NODE))
+        .reshape(n_sampled_nodes, _WEDGES_PER_SAMPLED_NODE)
+        .mean(axis=1)
+    )
+
+    return ClusteringEstimates(
+        transitivity=transitivity,
+        transitivity_half_width=_get_half_width(transitivity, n_samples),
+        average_clustering=average_clustering,
+        average_clustering_half_width=_get_half_width(average_clustering, n_samples),
+        sampled_clustering=sampled_clustering,
+        n_samples=n_samples,
+    )
+
+
+def _draw_closed_wedges(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    edge_keys: np.ndarray,
+    rng: np.random.Generator,
+    centers: np.ndarray,
+) -> np.ndarray:
+    """Draw a wedge at every center and tell whether it is closed.
+
+    The centers without wedges get open ones.
+    """
+    n_nodes = indptr.size - 1
+    degrees = np.diff(indptr)
+
+    has_wedges = degrees[centers] > 1
+    centers = centers[has_wedges]
+    center_degrees = degrees[centers]
+
+    # Two distinct neighbor positions, uniformly
+    firsts = (rng.random(centers.size) * center_degrees).astype(np.int64)
+    seconds = (rng.random(centers.size) * (center_degrees - 1)).astype(np.int64)
+    seconds += seconds >= firsts
+
+    ends_1 = indices[indptr[centers] + firsts]
+    ends_2 = indices[indptr[centers] + seconds]
+    keys = ends_1 * n_nodes + ends_2
+    found = np.minimum(np.searchsorted(edge_keys, keys), edge_keys.size - 1)
+
+    is_closed = np.zeros(has_wedges.size, dtype=bool)
+    is_closed[has_wedges] = edge_keys[found] == keys
+    return is_closed
+
+
+def _get_half_width(proportion: float, n_samples: int) -> float:
+    """Get the half-width of the 95% confidence interval of a proportion."""
+    return CONFIDENCE_Z * float(np.sqrt(proportion * (1 - proportion) / n_samples))
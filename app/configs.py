@@ -3,7 +3,13 @@ from pathlib import Path
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from app.vos import SupportedDataSets
+from app.vos import (
+    BfsEngine,
+    CandidatesStrategy,
+    SeedSelectionMethod,
+    SpreadEstimationMethod,
+    SupportedDataSets,
+)
 
 
 class Configs(BaseSettings):
@@ -15,6 +21,50 @@ class Configs(BaseSettings):
     SEABORD_STYLE: str = "darkgrid"
     SAVE_PLOTS_TO_FILES: bool = True
     ANALYSIS_N_DECIMAL_PLACES: int = 4
+    # `None` stands for all the CPUs
+    ANALYSIS_N_WORKERS: int | None = None
+    ANALYSIS_BFS_ENGINE: BfsEngine = BfsEngine.BIT_PARALLEL
+    # Components larger than that get the sampled-sources path analysis
+    ANALYSIS_APPROXIMATE_PATHS_N_NODES: int = 20_000
+    ANALYSIS_PATHS_N_SOURCES: int = 1000
+    # Smaller components get a single aggregate path analysis and no plot
+    ANALYSIS_PATHS_MIN_COMPONENT_N_NODES: int = 10
+    # Without it, only the diameter, the radius, the periphery and the center
+    ANALYSIS_PATH_LENGTH_DISTRIBUTION: bool = True
+    # Graphs with more edges get the sampled-wedges clustering analysis
+    ANALYSIS_APPROXIMATE_CLUSTERING_N_EDGES: int = 1_000_000
+    ANALYSIS_CLUSTERING_N_WEDGES: int = 100_000
+    # Runs of the communities detection, the best and the consensus are kept
+    ANALYSIS_COMMUNITIES_N_SEEDS: int = 10
+    # Fraction of the runs an edge has to be internal in, to join the consensus
+    ANALYSIS_COMMUNITIES_CONSENSUS_THRESHOLD: float = 0.5
+    # Modularity drift of the incremental updates that triggers a full detection
+    ANALYSIS_COMMUNITIES_MAX_MODULARITY_DRIFT: float = 0.01
+    # CSV files of the edges inserted and deleted by an incremental update
+    ANALYSIS_COMMUNITIES_INSERTED_EDGES_FILE_PATH: Path | None = None
+    ANALYSIS_COMMUNITIES_DELETED_EDGES_FILE_PATH: Path | None = None
+
+    MAXIMIZATION_SEED_SELECTION_METHOD: SeedSelectionMethod = SeedSelectionMethod.CELF
+    # `None` stands for all the CPUs
+    MAXIMIZATION_N_WORKERS: int | None = None
+    MAXIMIZATION_SPREAD_ESTIMATION_METHOD: SpreadEstimationMethod = (
+        SpreadEstimationMethod.MONTE_CARLO
+    )
+    # Target width of the spreads 95% confidence intervals, `None` to disable
+    MAXIMIZATION_CI_WIDTH: float | None = None
+    # Requires the greedy seed selection method
+    MAXIMIZATION_RACING: bool = False
+    # Upper bound of the simulations of a seed set along with the CI width
+    MAXIMIZATION_MAX_SIMULATIONS: int = 1000
+    # Stops the seeds selection once the marginal gain drops below it
+    MAXIMIZATION_MIN_MARGINAL_GAIN: float | None = None
+    MAXIMIZATION_CANDIDATES_STRATEGIES: tuple[CandidatesStrategy, ...] = (
+        CandidatesStrategy.BETWEENNESS,
+        CandidatesStrategy.PAGERANK,
+    )
+    MAXIMIZATION_N_CANDIDATES_PER_STRATEGY: int = 25
+    # Sampled pivots of the betweenness approximation, `None` for the exact one
+    MAXIMIZATION_BETWEENNESS_K: int | None = 500
 
     model_config = SettingsConfigDict(
         env_file=Path("..") / ".env",
@@ -7,3 +7,6 @@ cache_files_directory = Path("data/cache")
 
 SEED_VALUE = 42
 LARGE_GRAPH_N_NODES = 1000
+
+# Two-sided 95% quantile of the standard normal distribution
+CONFIDENCE_Z = 1.959963984540054
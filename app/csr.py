@@ -0,0 +1,164 @@
+"""Compressed sparse row (CSR) representation of graphs."""
+
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+
+@dataclass(frozen=True)
+class CsrGraph:
+    """Adjacency of a graph stored as `indptr` / `indices` arrays.
+
+    Nodes are enumerated in the order of `graph.nodes()`. The neighbors of the
+    node with index `i` are `indices[indptr[i]:indptr[i + 1]]`; positions in
+    `indices` are used as edge identifiers. An undirected edge is stored twice,
+    once per direction.
+    """
+
+    nodes: list[Any]
+    indptr: np.ndarray
+    indices: np.ndarray
+    node_index: dict[Any, int] = field(repr=False)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def n_edges(self) -> int:
+        """Number of stored (directed) edges."""
+        return int(self.indices.size)
+
+    @property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def get_fingerprint(self) -> str:
+        """Get a short digest of the nodes and the edges, e.g. to key caches."""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(repr(self.nodes).encode())
+        digest.update(self.indptr.tobytes())
+        digest.update(self.indices.tobytes())
+        return f"{self.n_nodes}_{self.n_edges}_{digest.hexdigest()}"
+
+    def get_node_indices(self, nodes: Iterable[Any]) -> np.ndarray:
+        return np.fromiter(
+            (self.node_index[node] for node in nodes),
+            dtype=np.int64,
+        )
+
+    def gather_edges(self, sources: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Gather the outgoing edges of `sources` in a vectorized way.
+
+        Returns:
+            The edges identifiers grouped by source, and the number of edges of
+            each source. Use `np.repeat(values, counts)` to align per-source
+            values with the edges.
+        """
+        return gather_ranges(self.indptr, sources)
+
+    def gather_targets(
+        self,
+        frontier: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gather the outgoing edges of a frontier of encoded nodes.
+
+        Batched traversals encode the nodes as `batch_position * n_nodes + node`,
+        plain node indices being the position 0. The targets keep the encoding of
+        their origins.
+
+        Returns:
+            The edges identifiers grouped by origin, the number of edges of each
+            origin and the encoded targets of the edges.
+        """
+        nodes = frontier % self.n_nodes
+        edges, counts = self.gather_edges(nodes)
+        targets = np.repeat(frontier - nodes, counts) + self.indices[edges]
+        return edges, counts, targets
+
+    def permute(self, order: np.ndarray) -> "CsrGraph":
+        """Get the same graph with the node `order[i]` moved to the index `i`."""
+        new_positions = np.empty(self.n_nodes, dtype=np.int64)
+        new_positions[order] = np.arange(order.size)
+
+        edges, counts = self.gather_edges(order)
+        nodes = [self.nodes[i] for i in order.tolist()]
+        return CsrGraph(
+            nodes=nodes,
+            indptr=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            indices=new_positions[self.indices[edges]],
+            node_index={node: index for index, node in enumerate(nodes)},
+        )
+
+    def get_block(self, start: int, stop: int) -> "CsrGraph":
+        """Get the subgraph of the nodes with indices from `start` to `stop`.
+
+        No edge may leave the block, as for a connected component whose nodes are
+        contiguous. Only the slices of the arrays belonging to the block are
+        copied, to shift them.
+        """
+        edges_start, edges_stop = self.indptr[start], self.indptr[stop]
+        nodes = self.nodes[start:stop]
+        return CsrGraph(
+            nodes=nodes,
+            indptr=self.indptr[start : stop + 1] - edges_start,
+            indices=self.indices[edges_start:edges_stop] - start,
+            node_index={node: index for index, node in enumerate(nodes)},
+        )
+
+    def to_scipy(self) -> sp.csr_array:
+        data = np.ones(self.n_edges, dtype=np.float64)
+        return sp.csr_array(
+            (data, self.indices, self.indptr),
+            shape=(self.n_nodes, self.n_nodes),
+        )
+
+
+def gather_ranges(
+    indptr: np.ndarray, rows: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Gather the positions of `rows` of a CSR structure in a vectorized way.
+
+    Returns:
+        The positions grouped by row, and the number of positions of each row.
+    """
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+
+    group_offsets = np.cumsum(counts) - counts
+    positions = np.arange(group_offsets[-1] + counts[-1] if counts.size else 0)
+    positions += np.repeat(starts - group_offsets, counts)
+    return positions, counts
+
+
+def deduplicate(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Drop the duplicates of `values` without sorting them, e.g. of a frontier.
+
+    `positions` is a scratch space indexed by the values, so it has to be larger
+    than any of them. Only its cells at `values` are overwritten.
+    """
+    positions[values] = np.arange(values.size)
+    return values[positions[values] == np.arange(values.size)]
+
+
+def to_csr_graph(graph: nx.Graph) -> CsrGraph:
+    nodes = list(graph.nodes())
+    adjacency = nx.to_scipy_sparse_array(
+        graph,
+        nodelist=nodes,
+        weight=None,
+        format="csr",
+    )
+    adjacency.sort_indices()
+
+    return CsrGraph(
+        nodes=nodes,
+        indptr=adjacency.indptr.astype(np.int64),
+        indices=adjacency.indices.astype(np.int64),
+        node_index={node: index for index, node in enumerate(nodes)},
+    )
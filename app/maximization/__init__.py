@@ -1,9 +1,13 @@
+from .candidates import get_candidates
 from .cascade import get_independent_cascade_top_influential_nodes
+from .imm import get_independent_cascade_top_influential_nodes_imm
 from .linear import get_linear_threshold_top_influential_nodes
 from .utils import visualize_influential_nodes
 
 __all__ = [
+    "get_candidates",
     "get_independent_cascade_top_influential_nodes",
+    "get_independent_cascade_top_influential_nodes_imm",
     "get_linear_threshold_top_influential_nodes",
     "visualize_influential_nodes",
 ]
@@ -0,0 +1,114 @@
+"""Preselection of the candidate seeds for the influence maximization."""
+
+import contextlib
+import pickle
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import numpy as np
+import structlog
+
+from app.analysis.betweenness import get_betweenness
+from app.analysis.closeness import get_top_closeness
+from app.analysis.spectral import get_pagerank, get_weighted_adjacency
+from app.constants import cache_files_directory
+from app.csr import CsrGraph, to_csr_graph
+from app.vos import CandidatesStrategy
+
+
+def get_candidates(
+    graph: nx.Graph,
+    graph_name: str | None = None,
+    strategies: tuple[CandidatesStrategy, ...] = (
+        CandidatesStrategy.BETWEENNESS,
+        CandidatesStrategy.PAGERANK,
+    ),
+    n_per_strategy: int = 25,
+    betweenness_k: int | None = 500,
+    n_workers: int | None = 1,
+) -> set[Any]:
+    """Get the union of the top `n_per_strategy` nodes of each strategy.
+
+    The betweenness is approximated with `betweenness_k` sampled pivots (`None`
+    for the exact one), its BFSs run in `n_workers` processes (`None` for all the
+    CPUs). The top closeness nodes are found without computing the closeness of
+    all the nodes, see `get_top_closeness`. The candidates are cached per
+    `graph_name`, fingerprint of the graph and parameters, so a graph changed
+    under the same name gets new candidates. Nothing is cached if `graph_name` is
+    not given.
+    """
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+    csr_graph = to_csr_graph(graph)
+
+    cache_file_path = None
+    if graph_name is not None:
+        cache_files_dir = cache_files_directory / Path("candidates")
+        cache_files_dir.mkdir(parents=True, exist_ok=True)
+
+        strategies_names = "_".join(strategy.value for strategy in strategies)
+        cache_file_path = cache_files_dir / Path(
+            f"{graph_name}_{csr_graph.get_fingerprint()}_{strategies_names}"
+            f"_{n_per_strategy}_{betweenness_k}.pkl"
+        )
+
+    if cache_file_path is not None and cache_file_path.exists():
+        with contextlib.suppress(Exception), cache_file_path.open("rb") as f:
+            logger.info("Using cached candidates", cache_file_path=cache_file_path)
+            return pickle.load(f)
+
+    candidates: set[Any] = set()
+    for strategy in strategies:
+        if strategy is CandidatesStrategy.CLOSENESS:
+            top_indices, _ = get_top_closeness(csr_graph, n_per_strategy)
+        else:
+            scores = _get_scores(
+                graph,
+                csr_graph,
+                strategy,
+                betweenness_k,
+                n_workers,
+            )
+            top_indices = _get_top_k_indices(scores, n_per_strategy)
+        candidates.update(csr_graph.nodes[index] for index in top_indices)
+
+    if cache_file_path is not None:
+        logger.info("Caching the candidates", cache_file_path=cache_file_path)
+        with cache_file_path.open("wb") as f:
+            pickle.dump(candidates, f)
+
+    return candidates
+
+
+def _get_scores(
+    graph: nx.Graph,
+    csr_graph: CsrGraph,
+    strategy: CandidatesStrategy,
+    betweenness_k: int | None,
+    n_workers: int | None = 1,
+) -> np.ndarray:
+    """Get the scores of the nodes, aligned with `csr_graph.nodes`."""
+    match strategy:
+        case CandidatesStrategy.BETWEENNESS:
+            if betweenness_k is not None:
+                betweenness_k = min(betweenness_k, csr_graph.n_nodes)
+            return get_betweenness(csr_graph, betweenness_k, n_workers=n_workers)
+        case CandidatesStrategy.PAGERANK:
+            return get_pagerank(get_weighted_adjacency(graph, csr_graph))
+        case CandidatesStrategy.DEGREE:
+            return csr_graph.degrees.astype(np.float64)
+
+
+def _get_top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Get the indices of the `k` largest scores without sorting all of them.
+
+    The result is ordered by decreasing score, ties broken by the index.
+    """
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    # The scores tied with the `k`-th one are all kept, so the index breaks ties
+    kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    top_indices = np.flatnonzero(scores >= kth_score)
+    return top_indices[np.lexsort((top_indices, -scores[top_indices]))][:k]
@@ -1,9 +1,16 @@
+from functools import partial
 from typing import Any
 
 import networkx as nx
 import numpy as np
 
-from app.constants import SEED_VALUE
+from app.csr import CsrGraph, deduplicate, to_csr_graph
+from app.maximization.draws import get_random_key, get_uniforms
+from app.maximization.dtos import SeedsSelection
+from app.maximization.estimation import monte_carlo_spread_estimator
+from app.maximization.selection import select_seeds
+from app.maximization.worlds import sample_ic_worlds
+from app.vos import SeedSelectionMethod, SpreadEstimationMethod
 
 
 def get_independent_cascade_top_influential_nodes(
@@ -12,88 +19,171 @@ def get_independent_cascade_top_influential_nodes(
     candidates: set[Any],
     num_simulations: int = 50,
     p: float = 0.1,
-) -> list[Any]:
+    method: SeedSelectionMethod = SeedSelectionMethod.GREEDY,
+    n_workers: int | None = 1,
+    estimation_method: SpreadEstimationMethod = SpreadEstimationMethod.MONTE_CARLO,
+    *,
+    ci_width: float | None = None,
+    racing: bool = False,
+    max_simulations: int | None = None,
+    min_marginal_gain: float | None = None,
+) -> SeedsSelection:
     """Find `n_top` influential nodes among `candidates` using Independent Cascade.
 
-    Utilizes the Greedy algorithm. The probabilities are fixed to `p`.
-    """
-    np.random.seed(SEED_VALUE)
-
-    probabilities_mapping = _generate_edge_probabilities(graph, p)
-
-    selected_seeds: list[Any] = []
-
-    for _ in range(n_top):
-        best_candidate = None
-        best_spread = -1.0
+    Utilizes the Greedy algorithm or one of its lazy variants, depending on
+    `method`. The probabilities are fixed to `p`. The simulations run in
+    `n_workers` processes (`None` for all the CPUs), which does not affect the
+    result. With the live-edge worlds estimation, `num_simulations` worlds are
+    sampled once and shared by all the candidates.
 
-        for candidate in candidates - set(selected_seeds):
-            current_seed_set = set(selected_seeds) | {candidate}
-            spread = _estimate_spread(
-                graph,
-                probabilities_mapping,
-                num_simulations,
-                current_seed_set,
-            )
+    The Monte Carlo simulations count becomes adaptive if `ci_width` or `racing`
+    is given, see `MonteCarloSpreadEstimator`. Racing requires the greedy
+    `method`, the lazy ones estimate the candidates one at a time.
 
-            if spread > best_spread:
-                best_spread = spread
-                best_candidate = candidate
+    Returns the seeds in the order of selection along with the spread and the
+    marginal gain at each step, see `select_seeds`.
+    """
+    if racing and method is not SeedSelectionMethod.GREEDY:
+        raise ValueError("Racing requires the greedy seed selection")
+
+    csr_graph = to_csr_graph(graph)
+    edge_probabilities = generate_edge_probabilities(csr_graph, p)
+    random_key = get_random_key()
+
+    if estimation_method is SpreadEstimationMethod.LIVE_EDGE_WORLDS:
+        estimate_spreads = sample_ic_worlds(
+            csr_graph,
+            edge_probabilities,
+            num_simulations,
+            random_key,
+            directed=graph.is_directed(),
+        )
+        selection = select_seeds(
+            candidates,
+            n_top,
+            estimate_spreads,
+            method,
+            min_marginal_gain,
+        )
+        selection.n_simulations = estimate_spreads.n_simulations_run
+        return selection
+
+    run_simulations = partial(
+        _run_ic_simulations,
+        csr_graph,
+        edge_probabilities,
+        random_key,
+    )
+
+    with monte_carlo_spread_estimator(
+        csr_graph,
+        run_simulations,
+        num_simulations,
+        n_workers,
+        ci_width=ci_width,
+        racing=racing,
+        max_simulations=max_simulations,
+    ) as estimate_spreads:
+        selection = select_seeds(
+            candidates,
+            n_top,
+            estimate_spreads,
+            method,
+            min_marginal_gain,
+        )
+        selection.n_simulations = estimate_spreads.n_simulations_run
+        return selection
+
+
+def generate_edge_probabilities(
+    csr_graph: CsrGraph,
+    p: float = 0.1,
+) -> np.ndarray:
+    """Generate fixed edge probabilities aligned with the CSR edges."""
+    return np.full(csr_graph.n_edges, p, dtype=np.float64)
 
-        if best_candidate is None:
-            break
-        selected_seeds.append(best_candidate)
 
-    return selected_seeds
+def _run_ic_simulations(
+    csr_graph: CsrGraph,
+    edge_probabilities: np.ndarray,
+    random_key: np.uint64,
+    seed_indices: np.ndarray,
+    n_simulations: int,
+    first_simulation_id: int = 0,
+) -> np.ndarray:
+    """Run a batch of Independent Cascade simulations.
 
+    Returns:
+        The number of activated nodes in each simulation.
+    """
+    n_nodes = csr_graph.n_nodes
+
+    activated = np.zeros(n_simulations * n_nodes, dtype=bool)
+    frontier = (np.arange(n_simulations)[:, None] * n_nodes + seed_indices).ravel()
+
+    activated_ids = run_ic_cascades(
+        csr_graph,
+        edge_probabilities,
+        frontier,
+        activated,
+        random_key,
+        first_simulation_id,
+    )
+    return np.bincount(activated_ids // n_nodes, minlength=n_simulations)
+
+
+def run_ic_cascades(
+    csr_graph: CsrGraph,
+    edge_probabilities: np.ndarray,
+    frontier: np.ndarray,
+    activated: np.ndarray,
+    random_key: np.uint64,
+    first_simulation_id: int = 0,
+    positions: np.ndarray | None = None,
+) -> np.ndarray:
+    """Propagate a batch of Independent Cascades starting from `frontier`.
+
+    The simulations advance together: the frontier holds the newly activated
+    nodes of all the simulations, encoded as `simulation * n_nodes + node`, and
+    the outgoing edges of the whole frontier are tested at once. The edge is live
+    in the simulation if its draw is below its probability.
+
+    Args:
+        csr_graph: The graph.
+        edge_probabilities: The activation probabilities aligned with the edges.
+        frontier: The encoded initially active nodes, without duplicates.
+        activated: The encoded activation flags, updated in place. It has to be
+            large enough to hold all the simulations of the batch.
+        random_key: The key of the counter-based draws.
+        first_simulation_id: The global identifier of the batch first simulation,
+            so that different batches get different draws.
+        positions: The scratch space to deduplicate the frontiers, as large as
+            `activated`. Allocated per call unless given, e.g. to be reused
+            across the batches.
+
+    Returns:
+        The encoded activated nodes, including `frontier`.
+    """
+    n_nodes, n_edges = csr_graph.n_nodes, csr_graph.n_edges
 
-def _generate_edge_probabilities(
-    graph: nx.Graph,
-    p: float = 0.1,
-) -> dict[Any, dict[Any, float]]:
-    """Generate fixed edge probabilities mapping."""
-    probabilities_mapping: dict[Any, dict[Any, float]] = {}
+    activated[frontier] = True
+    activated_ids = [frontier]
 
-    for node in graph.nodes():
-        neighbors = list(graph.neighbors(node))
-        probabilities_mapping[node] = dict.fromkeys(neighbors, p)
+    if positions is None:
+        positions = np.empty(activated.size, dtype=np.int64)
 
-    return probabilities_mapping
+    while frontier.size:
+        edges, _, targets = csr_graph.gather_targets(frontier)
+        is_inactive = ~activated[targets]
+        edges, targets = edges[is_inactive], targets[is_inactive]
 
+        simulation_ids = (targets // n_nodes) + first_simulation_id
+        draws = get_uniforms(simulation_ids * n_edges + edges, random_key)
 
-def _estimate_spread(
-    graph: nx.Graph,
-    probabilities_mapping: dict[Any, dict[Any, float]],
-    n_simulations: int,
-    seed_set: set[Any],
-) -> float:
-    total_spread = 0
-    for _ in range(n_simulations):
-        total_spread += _run_ic_simulation(graph, probabilities_mapping, seed_set)
-    return total_spread / n_simulations
+        targets = targets[draws < edge_probabilities[edges]]
 
+        frontier = deduplicate(targets, positions)
+        activated[frontier] = True
+        activated_ids.append(frontier)
 
-def _run_ic_simulation(
-    graph: nx.Graph,
-    probabilities_mapping: dict[Any, dict[Any, float]],
-    seed_set: set[Any],
-) -> int:
-    """Run one simulation of the Independent Cascade model."""
-    activated: set[Any] = set(seed_set)
-    new_active: set[Any] = set(seed_set)
-
-    while new_active:
-        next_active: set[Any] = set()
-
-        for node in new_active:
-            for neighbor in graph.neighbors(node):
-                if (
-                    neighbor not in activated
-                    and np.random.rand() < probabilities_mapping[node][neighbor]
-                ):
-                    next_active.add(neighbor)
-
-        new_active = next_active - activated
-        activated.update(new_active)
-
-    return len(activated)
+    return np.concatenate(activated_ids)
@@ -0,0 +1,27 @@
+"""Counter-based random draws."""
+
+import numpy as np
+
+from app.constants import SEED_VALUE
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+
+def get_random_key(seed: int = SEED_VALUE) -> np.uint64:
+    return np.random.SeedSequence(seed).generate_state(1, dtype=np.uint64)[0]
+
+
+def get_uniforms(counters: np.ndarray, key: np.uint64) -> np.ndarray:
+    """Map the `counters` to uniform numbers in [0, 1) using SplitMix64.
+
+    The same counter and key always produce the same number. That allows drawing
+    numbers only for the events that actually happen, in any order and in batches,
+    while keeping the outcome of every event fixed.
+    """
+    z = counters.astype(np.uint64) * _GOLDEN_GAMMA + key
+    z = (z ^ (z >> np.uint64(30))) * _MIX_MULTIPLIER_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_MULTIPLIER_2
+    z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0**-53
@@ -0,0 +1,15 @@
+"""Maximization data transfer objects."""
+
+from typing import Any
+
+from app.dtos import CustomBaseModel
+
+
+class SeedsSelection(CustomBaseModel):
+    """Seeds in the order of selection, each prefix being the greedy solution."""
+
+    seeds: list[Any]
+    spreads: list[float]
+    marginal_gains: list[float]
+    # Number of seed set evaluations times the samples each of them took
+    n_simulations: int = 0
@@ -0,0 +1,278 @@
+"""Monte Carlo estimation of the spread of seed sets."""
+
+import math
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from itertools import pairwise
+from typing import Any, NamedTuple
+
+import numpy as np
+import structlog
+
+from app.constants import CONFIDENCE_Z
+from app.csr import CsrGraph
+from app.parallel import get_n_workers, process_pool
+
+# Runs simulations given seed indices, the number of simulations, and the global
+# identifier of the first simulation. Returns the spread of each simulation.
+type SimulationsRunner = Callable[[np.ndarray, int, int], np.ndarray]
+
+# Number of tasks per worker in a batch, to balance uneven simulations
+_TASKS_PER_WORKER = 4
+
+# Default upper bound of the adaptive simulations count, in rounds
+_MAX_ROUNDS = 20
+
+# Racing starts with rounds of that fraction of the budget, doubling them after
+# every round, but not below the minimum to keep the first intervals meaningful
+_RACING_FIRST_ROUND_FRACTION = 1 / 8
+_RACING_MIN_FIRST_ROUND = 10
+
+_worker_run_simulations: SimulationsRunner | None = None
+
+
+class MonteCarloSpreadEstimator:
+    """Estimates spreads of seed sets, optionally in a process pool.
+
+    The simulations of a seed set are split into blocks of consecutive simulation
+    identifiers, and the blocks of all the seed sets in a batch are spread across
+    the workers. Every simulation draws from its own counter range of the random
+    key derived from `SEED_VALUE`, so the estimates are identical for any number
+    of workers and any blocks layout.
+
+    By default each seed set gets `n_simulations` simulations. The count becomes
+    adaptive if `ci_width` or `racing` is given:
+
+    - With `ci_width`, the simulations run in rounds of `n_simulations`, up to
+      `max_simulations`, and a seed set stops getting new rounds once its 95%
+      confidence interval is narrower than `ci_width`.
+    - With `racing`, all the seed sets of a batch race each other. The first round
+      is a small fraction of `n_simulations`, every next round is twice as large,
+      and a seed set drops out once its interval lies below the interval of the
+      best seed set of the batch. The contenders left run up to `n_simulations`,
+      or `max_simulations` along with `ci_width`. So racing never costs more than
+      the fixed budget, and the estimate of the winner is the fixed budget one.
+      Racing only fits batches holding all the candidates, as the greedy
+      selection does.
+
+    The mean, the confidence interval and the simulations count of every
+    estimated seed set are logged.
+    """
+
+    def __init__(
+        self,
+        csr_graph: CsrGraph,
+        run_simulations: SimulationsRunner,
+        n_simulations: int,
+        executor: Executor | None = None,
+        n_workers: int = 1,
+        *,
+        ci_width: float | None = None,
+        racing: bool = False,
+        max_simulations: int | None = None,
+    ) -> None:
+        self._csr_graph = csr_graph
+        self._run_simulations = run_simulations
+        self._n_simulations = n_simulations
+        self._executor = executor
+        self._n_workers = n_workers
+        self._ci_width = ci_width
+        self._racing = racing
+        self._max_simulations = n_simulations
+        if ci_width is not None:
+            self._max_simulations = max_simulations or n_simulations * _MAX_ROUNDS
+
+        self._first_round_n_simulations = n_simulations
+        if racing:
+            self._first_round_n_simulations = min(
+                max(
+                    math.ceil(n_simulations * _RACING_FIRST_ROUND_FRACTION),
+                    _RACING_MIN_FIRST_ROUND,
+                ),
+                n_simulations,
+            )
+        self.n_simulations_run = 0
+
+        self._logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    def __call__(self, seed_sets: list[set[Any]]) -> list[float]:
+        return [estimate.mean for estimate in self._estimate(seed_sets)]
+
+    def _estimate(self, seed_sets: list[set[Any]]) -> list["_SpreadEstimate"]:
+        if not seed_sets:
+            return []
+
+        seed_indices = [self._csr_graph.get_node_indices(s) for s in seed_sets]
+        n_seed_sets = len(seed_sets)
+
+        totals = np.zeros(n_seed_sets, dtype=np.int64)
+        squares = np.zeros(n_seed_sets, dtype=np.int64)
+        counts = np.zeros(n_seed_sets, dtype=np.int64)
+
+        active = np.arange(n_seed_sets)
+        round_n_simulations = self._first_round_n_simulations
+        while active.size:
+            n_simulations = np.minimum(
+                round_n_simulations,
+                self._max_simulations - counts[active],
+            )
+            block_sums = self._simulate(
+                [seed_indices[i] for i in active],
+                n_simulations,
+                counts[active],
+            )
+            totals[active] += block_sums[:, 0]
+            squares[active] += block_sums[:, 1]
+            counts[active] += n_simulations
+
+            means, half_widths = _get_confidence_intervals(totals, squares, counts)
+            needs_more = self._needs_more_simulations(means, half_widths, counts)
+            active = active[needs_more[active]]
+            if self._racing:
+                round_n_simulations *= 2
+
+        self.n_simulations_run += int(counts.sum())
+
+        estimates = [
+            _SpreadEstimate(
+                mean=float(mean),
+                ci_low=float(mean - half_width),
+                ci_high=float(mean + half_width),
+                n_simulations=int(count),
+            )
+            for mean, half_width, count in zip(means, half_widths, counts, strict=True)
+        ]
+        for seed_set, estimate in zip(seed_sets, estimates, strict=True):
+            self._logger.info(
+                "Spread estimated",
+                seeds=sorted(seed_set, key=str),
+                mean=estimate.mean,
+                ci=(estimate.ci_low, estimate.ci_high),
+                n_simulations=estimate.n_simulations,
+            )
+        return estimates
+
+    def _needs_more_simulations(
+        self,
+        means: np.ndarray,
+        half_widths: np.ndarray,
+        counts: np.ndarray,
+    ) -> np.ndarray:
+        """Get the mask of the seed sets whose estimates need another round."""
+        if self._ci_width is None and not self._racing:
+            return np.zeros(counts.size, dtype=bool)
+
+        needs_more = counts < self._max_simulations
+        if self._ci_width is not None:
+            needs_more &= 2 * half_widths > self._ci_width
+        if self._racing:
+            best_ci_low = np.max(means - half_widths)
+            needs_more &= means + half_widths >= best_ci_low
+        return needs_more
+
+    def _simulate(
+        self,
+        seed_indices: list[np.ndarray],
+        n_simulations: np.ndarray,
+        first_simulation_ids: np.ndarray,
+    ) -> np.ndarray:
+        """Run the simulations of a round.
+
+        Returns:
+            The sum and the sum of squares of the spreads of each seed set.
+        """
+        n_blocks = 1
+        if self._executor is not None and seed_indices:
+            n_blocks = math.ceil(
+                self._n_workers * _TASKS_PER_WORKER / len(seed_indices)
+            )
+            n_blocks = min(n_blocks, int(n_simulations.min()))
+
+        tasks = []
+        for indices, n, first_id in zip(
+            seed_indices, n_simulations, first_simulation_ids, strict=True
+        ):
+            bounds = np.linspace(0, n, n_blocks + 1).astype(int) + first_id
+            tasks += [
+                (indices, int(end - start), int(start))
+                for start, end in pairwise(bounds)
+            ]
+
+        if self._executor is None:
+            sums = [_sum_spreads(self._run_simulations(*task)) for task in tasks]
+        else:
+            sums = list(self._executor.map(_run_block, *zip(*tasks, strict=True)))
+
+        return np.array(sums, dtype=np.int64).reshape(-1, n_blocks, 2).sum(axis=1)
+
+
+class _SpreadEstimate(NamedTuple):
+    """Mean spread of a seed set and its 95% confidence interval."""
+
+    mean: float
+    ci_low: float
+    ci_high: float
+    n_simulations: int
+
+
+def _get_confidence_intervals(
+    totals: np.ndarray,
+    squares: np.ndarray,
+    counts: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get the means and the half-widths of the 95% confidence intervals."""
+    means = totals / counts
+    variances = np.maximum(squares / counts - means**2, 0.0)
+    variances *= counts / np.maximum(counts - 1, 1)
+    return means, CONFIDENCE_Z * np.sqrt(variances / counts)
+
+
+@contextmanager
+def monte_carlo_spread_estimator(
+    csr_graph: CsrGraph,
+    run_simulations: SimulationsRunner,
+    n_simulations: int,
+    n_workers: int | None = 1,
+    *,
+    ci_width: float | None = None,
+    racing: bool = False,
+    max_simulations: int | None = None,
+) -> Iterator[MonteCarloSpreadEstimator]:
+    """Provide an estimator, owning the process pool during the context."""
+    n_workers = get_n_workers(n_workers)
+
+    with process_pool(
+        n_workers,
+        initializer=_init_worker,
+        initargs=(run_simulations,),
+    ) as executor:
+        yield MonteCarloSpreadEstimator(
+            csr_graph,
+            run_simulations,
+            n_simulations,
+            executor,
+            n_workers,
+            ci_width=ci_width,
+            racing=racing,
+            max_simulations=max_simulations,
+        )
+
+
+def _init_worker(run_simulations: SimulationsRunner) -> None:
+    global _worker_run_simulations  # noqa: PLW0603
+    _worker_run_simulations = run_simulations
+
+
+def _run_block(
+    seed_indices: np.ndarray,
+    n_simulations: int,
+    first_simulation_id: int,
+) -> tuple[int, int]:
+    spreads = _worker_run_simulations(seed_indices, n_simulations, first_simulation_id)
+    return _sum_spreads(spreads)
+
+
+def _sum_spreads(spreads: np.ndarray) -> tuple[int, int]:
+    spreads = spreads.astype(np.int64)
+    return int(spreads.sum()), int((spreads**2).sum())
@@ -0,0 +1,230 @@
+"""Influence Maximization via Martingales (IMM) for Independent Cascade.
+
+Tang, Shi and Xiao, "Influence Maximization in Near-Linear Time: A Martingale
+Approach", SIGMOD 2015.
+"""
+
+import math
+
+import networkx as nx
+import numpy as np
+import structlog
+
+from app.constants import SEED_VALUE
+from app.csr import CsrGraph, gather_ranges, to_csr_graph
+from app.maximization.cascade import generate_edge_probabilities, run_ic_cascades
+from app.maximization.draws import get_random_key
+from app.maximization.dtos import SeedsSelection
+
+# Upper bound of the number of cells of the activation flags of an RR sets batch
+_RR_SETS_BATCH_CELLS = 1 << 24
+
+
+def get_independent_cascade_top_influential_nodes_imm(
+    graph: nx.Graph,
+    n_top: int,
+    p: float = 0.1,
+    epsilon: float = 0.5,
+    delta: float | None = None,
+) -> SeedsSelection:
+    """Find `n_top` influential nodes using Independent Cascade and IMM.
+
+    Samples random reverse reachable (RR) sets and solves the maximum coverage
+    problem over all the nodes. With probability at least `1 - delta` the spread
+    of the result is at least `(1 - 1/e - epsilon)` of the optimal one. The number
+    of RR sets is chosen automatically. `delta` defaults to `1 / n_nodes`.
+
+    The RR sets that bound the optimal spread are discarded, and the nodes are
+    selected over a fresh collection, which the guarantee relies on (Chen, "An
+    Issue in the Martingale Analysis of the Influence Maximization Algorithm
+    IMM", 2018).
+
+    Returns the seeds in the order of selection along with the spread estimated
+    by the coverage and the marginal gain at each step. `n_simulations` is the
+    number of the RR sets sampled in both phases.
+    """
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    csr_graph = to_csr_graph(graph.reverse() if graph.is_directed() else graph)
+    n_nodes = csr_graph.n_nodes
+    n_top = min(n_top, n_nodes)
+    selection = SeedsSelection(seeds=[], spreads=[], marginal_gains=[])
+    if n_top <= 0:
+        return selection
+
+    if delta is None:
+        delta = 1 / n_nodes
+    edge_probabilities = generate_edge_probabilities(csr_graph, p)
+
+    bounding_rr_sets = _RRSetsCollection(csr_graph, edge_probabilities, SEED_VALUE)
+    n_rr_sets = _get_required_rr_sets_number(bounding_rr_sets, n_top, epsilon, delta)
+
+    rr_sets = _RRSetsCollection(csr_graph, edge_probabilities, SEED_VALUE + 1)
+    rr_sets.extend(n_rr_sets)
+    seed_indices, coverages = rr_sets.select_nodes(n_top)
+
+    previous_spread = 0.0
+    for index, coverage in zip(seed_indices, coverages, strict=True):
+        spread = n_nodes * coverage
+        selection.seeds.append(csr_graph.nodes[index])
+        selection.spreads.append(spread)
+        selection.marginal_gains.append(spread - previous_spread)
+        previous_spread = spread
+    selection.n_simulations = bounding_rr_sets.size + rr_sets.size
+
+    logger.info(
+        "IMM: Reverse reachable sets sampled",
+        n_bounding_rr_sets=bounding_rr_sets.size,
+        n_rr_sets=rr_sets.size,
+        estimated_spread=previous_spread,
+    )
+    return selection
+
+
+def _get_required_rr_sets_number(
+    rr_sets: "_RRSetsCollection",
+    n_top: int,
+    epsilon: float,
+    delta: float,
+) -> int:
+    """Estimate a lower bound of the optimal spread and derive the RR sets number.
+
+    The failure probability is split equally between the estimation of the lower
+    bound and the final node selection.
+    """
+    n_nodes = rr_sets.csr_graph.n_nodes
+    log_n_choose_k = _log_n_choose_k(n_nodes, n_top)
+    log_inverse_delta = math.log(2 / delta)
+
+    epsilon_prime = math.sqrt(2) * epsilon
+    lambda_prime = (
+        (2 + 2 / 3 * epsilon_prime)
+        * (log_n_choose_k + log_inverse_delta + math.log(max(math.log2(n_nodes), 1)))
+        * n_nodes
+        / epsilon_prime**2
+    )
+
+    lower_bound = 1.0
+    for i in range(1, max(math.ceil(math.log2(n_nodes)), 1)):
+        x = n_nodes / 2**i
+        rr_sets.extend(math.ceil(lambda_prime / x))
+
+        _, coverages = rr_sets.select_nodes(n_top)
+        coverage = coverages[-1]
+        if n_nodes * coverage >= (1 + epsilon_prime) * x:
+            lower_bound = n_nodes * coverage / (1 + epsilon_prime)
+            break
+
+    alpha = math.sqrt(log_inverse_delta)
+    beta = math.sqrt((1 - 1 / math.e) * (log_n_choose_k + log_inverse_delta))
+    lambda_star = 2 * n_nodes * ((1 - 1 / math.e) * alpha + beta) ** 2 / epsilon**2
+
+    return math.ceil(lambda_star / lower_bound)
+
+
+def _log_n_choose_k(n: int, k: int) -> float:
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+class _RRSetsCollection:
+    """Growing collection of random reverse reachable sets.
+
+    An RR set is the set of nodes reached by an Independent Cascade started from
+    a uniformly random root over the reversed graph. The RR sets are stored
+    flattened, in the CSR fashion. Collections with different `seed` values are
+    independent.
+    """
+
+    def __init__(
+        self,
+        csr_graph: CsrGraph,
+        edge_probabilities: np.ndarray,
+        seed: int = SEED_VALUE,
+    ) -> None:
+        self.csr_graph = csr_graph
+        self.edge_probabilities = edge_probabilities
+
+        self._rng = np.random.default_rng(seed)
+        self._random_key = get_random_key(seed)
+        self._batch_size = max(1, _RR_SETS_BATCH_CELLS // csr_graph.n_nodes)
+        self._activated = np.zeros(
+            self._batch_size * csr_graph.n_nodes,
+            dtype=bool,
+        )
+        # Scratch space of the cascades, shared by all the batches
+        self._positions = np.empty(self._activated.size, dtype=np.int64)
+
+        self._sets_nodes: list[np.ndarray] = []
+        self._sets_sizes: list[np.ndarray] = []
+        self.size = 0
+
+    def extend(self, target_size: int) -> None:
+        """Sample RR sets until the collection holds `target_size` of them."""
+        n_nodes = self.csr_graph.n_nodes
+
+        while self.size < target_size:
+            batch_size = min(self._batch_size, target_size - self.size)
+            roots = self._rng.integers(n_nodes, size=batch_size)
+            frontier = np.arange(batch_size) * n_nodes + roots
+
+            activated_ids = run_ic_cascades(
+                self.csr_graph,
+                self.edge_probabilities,
+                frontier,
+                self._activated,
+                self._random_key,
+                first_simulation_id=self.size,
+                positions=self._positions,
+            )
+            self._activated[activated_ids] = False
+
+            activated_ids.sort()
+            self._sets_nodes.append(activated_ids % n_nodes)
+            self._sets_sizes.append(
+                np.bincount(activated_ids // n_nodes, minlength=batch_size)
+            )
+            self.size += batch_size
+
+    def select_nodes(self, n_top: int) -> tuple[list[int], list[float]]:
+        """Greedily solve the maximum coverage problem over the RR sets.
+
+        Once every RR set is covered, the remaining nodes are picked by their
+        index, so the selected nodes are always distinct.
+
+        Returns:
+            The indices of the selected nodes and the fraction of the RR sets
+            covered by each prefix of them.
+        """
+        n_nodes = self.csr_graph.n_nodes
+
+        sets_nodes = np.concatenate(self._sets_nodes)
+        sets_indptr = np.concatenate(([0], np.cumsum(np.concatenate(self._sets_sizes))))
+        sets_ids = np.repeat(np.arange(self.size), np.diff(sets_indptr))
+
+        # Node -> RR sets containing it
+        order = np.argsort(sets_nodes, kind="stable")
+        nodes_sets = sets_ids[order]
+        nodes_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(sets_nodes, minlength=n_nodes)))
+        )
+
+        coverage_counts = np.bincount(sets_nodes, minlength=n_nodes)
+        is_covered = np.zeros(self.size, dtype=bool)
+
+        selected_nodes: list[int] = []
+        coverages: list[float] = []
+        for _ in range(n_top):
+            node = int(np.argmax(coverage_counts))
+            selected_nodes.append(node)
+
+            node_sets = nodes_sets[nodes_indptr[node] : nodes_indptr[node + 1]]
+            newly_covered = node_sets[~is_covered[node_sets]]
+            is_covered[newly_covered] = True
+
+            positions, _ = gather_ranges(sets_indptr, newly_covered)
+            coverage_counts -= np.bincount(sets_nodes[positions], minlength=n_nodes)
+            # Rules out the selected node, the others never go below zero
+            coverage_counts[node] = -1
+            coverages.append(float(is_covered.mean()))
+
+        return selected_nodes, coverages
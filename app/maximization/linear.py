@@ -1,9 +1,17 @@
+from functools import partial
 from typing import Any
 
 import networkx as nx
 import numpy as np
 
 from app.constants import SEED_VALUE
+from app.csr import CsrGraph, to_csr_graph
+from app.maximization.draws import get_random_key, get_uniforms
+from app.maximization.dtos import SeedsSelection
+from app.maximization.estimation import monte_carlo_spread_estimator
+from app.maximization.selection import select_seeds
+from app.maximization.worlds import sample_lt_worlds
+from app.vos import SeedSelectionMethod, SpreadEstimationMethod
 
 
 def get_linear_threshold_top_influential_nodes(
@@ -11,106 +19,176 @@ def get_linear_threshold_top_influential_nodes(
     n_top: int,
     candidates: set[Any],
     num_simulations: int = 50,
-) -> list[Any]:
+    method: SeedSelectionMethod = SeedSelectionMethod.GREEDY,
+    n_workers: int | None = 1,
+    estimation_method: SpreadEstimationMethod = SpreadEstimationMethod.MONTE_CARLO,
+    *,
+    ci_width: float | None = None,
+    racing: bool = False,
+    max_simulations: int | None = None,
+    min_marginal_gain: float | None = None,
+) -> SeedsSelection:
     """Find `n_top` influential nodes among `candidates` using Linear Threshold.
 
-    Utilizes the Greedy algorithm. The edges weights and the thresholds are generated
-    randomly.
-    """
-
-    np.random.seed(SEED_VALUE)
-
-    weights_mapping = _generate_edge_weights(graph)
-    selected_seeds: list[Any] = []
-
-    for _ in range(n_top):
-        best_candidate = None
-        best_spread = -1.0
-
-        for candidate in candidates - set(selected_seeds):
-            current_seed_set = set(selected_seeds) | {candidate}
-            spread = _estimate_spread(
-                graph,
-                weights_mapping,
-                num_simulations,
-                current_seed_set,
-            )
-
-            if spread > best_spread:
-                best_spread = spread
-                best_candidate = candidate
-
-        if best_candidate is None:
-            break
-        selected_seeds.append(best_candidate)
+    Utilizes the Greedy algorithm or one of its lazy variants, depending on
+    `method`. The edges weights are generated randomly. The simulations run in
+    `n_workers` processes (`None` for all the CPUs), which does not affect the
+    result. With the live-edge worlds estimation, `num_simulations` worlds are
+    sampled once and shared by all the candidates.
 
-    return selected_seeds
+    The Monte Carlo simulations count becomes adaptive if `ci_width` or `racing`
+    is given, see `MonteCarloSpreadEstimator`. Racing requires the greedy
+    `method`, the lazy ones estimate the candidates one at a time.
 
-
-def _generate_edge_weights(graph: nx.Graph) -> dict[Any, dict[Any, float]]:
+    Returns the seeds in the order of selection along with the spread and the
+    marginal gain at each step, see `select_seeds`.
+    """
+    if racing and method is not SeedSelectionMethod.GREEDY:
+        raise ValueError("Racing requires the greedy seed selection")
+
+    csr_graph = to_csr_graph(graph)
+    edge_weights = generate_edge_weights(csr_graph)
+    random_key = get_random_key()
+
+    if estimation_method is SpreadEstimationMethod.LIVE_EDGE_WORLDS:
+        estimate_spreads = sample_lt_worlds(
+            csr_graph,
+            edge_weights,
+            num_simulations,
+            random_key,
+        )
+        selection = select_seeds(
+            candidates,
+            n_top,
+            estimate_spreads,
+            method,
+            min_marginal_gain,
+        )
+        selection.n_simulations = estimate_spreads.n_simulations_run
+        return selection
+
+    influence_graph, edge_order = _get_influence_graph(csr_graph)
+    cumulative_weights = np.concatenate(([0.0], np.cumsum(edge_weights)))
+    run_simulations = partial(
+        _run_lt_simulations,
+        influence_graph,
+        cumulative_weights[:-1][edge_order],
+        cumulative_weights[1:][edge_order],
+        cumulative_weights[csr_graph.indptr[:-1]],
+        random_key,
+    )
+
+    with monte_carlo_spread_estimator(
+        influence_graph,
+        run_simulations,
+        num_simulations,
+        n_workers,
+        ci_width=ci_width,
+        racing=racing,
+        max_simulations=max_simulations,
+    ) as estimate_spreads:
+        selection = select_seeds(
+            candidates,
+            n_top,
+            estimate_spreads,
+            method,
+            min_marginal_gain,
+        )
+        selection.n_simulations = estimate_spreads.n_simulations_run
+        return selection
+
+
+def generate_edge_weights(csr_graph: CsrGraph) -> np.ndarray:
+    """Generate random weights of the neighbors of each node.
+
+    The weights of the neighbors of a node sum up to `max_weights_sum`, and are
+    aligned with the CSR edges.
+    """
     max_weights_sum = 0.9
-    weights_mapping: dict[Any, dict[Any, float]] = {}
+    rng = np.random.default_rng(SEED_VALUE)
 
-    for node in graph.nodes():
-        neighbors = list(graph.neighbors(node))
+    rows = np.repeat(np.arange(csr_graph.n_nodes), csr_graph.degrees)
+    raw_weights = rng.random(csr_graph.n_edges)
+    totals = np.bincount(rows, weights=raw_weights, minlength=csr_graph.n_nodes)
+    return raw_weights / totals[rows] * max_weights_sum
 
-        if not neighbors:
-            weights_mapping[node] = {}
-            continue
 
-        raw_weights = np.random.rand(len(neighbors))
-        total = raw_weights.sum()
-        weights = (raw_weights / total) * max_weights_sum
+def _get_influence_graph(csr_graph: CsrGraph) -> tuple[CsrGraph, np.ndarray]:
+    """Get the graph along which influence spreads.
 
-        weights_mapping[node] = dict(zip(neighbors, weights, strict=True))
+    The returned graph is the transposed one, so its edges go from the influencing
+    neighbor to the influenced node.
 
-    return weights_mapping
-
-
-def _estimate_spread(
-    graph: nx.Graph,
-    weights_mapping: dict[Any, dict[Any, float]],
+    Returns:
+        The graph and, for each of its edges, the identifier of the corresponding
+        edge of `csr_graph`.
+    """
+    rows = np.repeat(np.arange(csr_graph.n_nodes), csr_graph.degrees)
+    edge_order = np.lexsort((rows, csr_graph.indices))
+
+    counts = np.bincount(csr_graph.indices, minlength=csr_graph.n_nodes)
+    influence_graph = CsrGraph(
+        nodes=csr_graph.nodes,
+        indptr=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        indices=rows[edge_order],
+        node_index=csr_graph.node_index,
+    )
+    return influence_graph, edge_order
+
+
+def _run_lt_simulations(
+    influence_graph: CsrGraph,
+    edge_lows: np.ndarray,
+    edge_highs: np.ndarray,
+    row_starts: np.ndarray,
+    random_key: np.uint64,
+    seed_indices: np.ndarray,
     n_simulations: int,
-    seed_set: set[Any],
-) -> float:
-    total_spread = 0
-    for _ in range(n_simulations):
-        total_spread += _run_lt_simulation(graph, weights_mapping, seed_set)
-    return total_spread / n_simulations
-
-
-def _run_lt_simulation(
-    graph: nx.Graph,
-    weights_mapping: dict[Any, dict[Any, float]],
-    seed_set: set[Any],
-) -> int:
-    """Run one Linear Threshold simulation.
-
-    Each node gets a threshold sampled in [0,1].
-
-    Parameters:
-        seed_set (Set[Any]): The set of initially active nodes.
+    first_simulation_id: int = 0,
+) -> np.ndarray:
+    """Run a batch of Linear Threshold simulations over live-edge worlds.
+
+    A Linear Threshold cascade is distributed as the reachability in a world where
+    each node picks at most one of its neighbors, the neighbor with the
+    probability equal to its weight. Each node gets a draw in [0,1), and the edge
+    of its neighbors whose cumulative weights interval of the row, offset by
+    `row_starts`, holds the draw is the picked one. Unlike sampled thresholds,
+    that keeps every simulation submodular, so the lazy seed selections match the
+    greedy one.
+
+    The simulations advance together and only the neighbors of the newly
+    activated nodes are touched: those that picked a frontier node form the next
+    frontier. Nodes are encoded as `simulation * n_nodes + node`, and the draws
+    are made for the touched nodes only, with the encoded node as the counter, as
+    in `sample_lt_worlds`.
+
+    Returns:
+        The number of activated nodes in each simulation.
     """
-    thresholds: dict[Any, float] = {v: np.random.rand() for v in graph.nodes()}
-
-    activated: set[Any] = set(seed_set)
-    newly_activated: set[Any] = set(seed_set)
-
-    while newly_activated:
-        next_activated: set[Any] = set()
-        for node in graph.nodes():
-            if node in activated:
-                continue
-
-            influence_sum = 0
-            for neighbor in graph.neighbors(node):
-                if neighbor in activated:
-                    influence_sum += weights_mapping[node][neighbor]
-
-            if influence_sum >= thresholds[node]:
-                next_activated.add(node)
-
-        newly_activated = next_activated - activated
-        activated.update(newly_activated)
-
-    return len(activated)
+    n_nodes = influence_graph.n_nodes
+    counters_offset = first_simulation_id * n_nodes
+
+    activated = np.zeros(n_simulations * n_nodes, dtype=bool)
+
+    frontier = (np.arange(n_simulations)[:, None] * n_nodes + seed_indices).ravel()
+    activated[frontier] = True
+    activated_ids = [frontier]
+
+    while frontier.size:
+        edges, _, targets = influence_graph.gather_targets(frontier)
+        is_inactive = ~activated[targets]
+        edges, targets = edges[is_inactive], targets[is_inactive]
+
+        # A node picks a single neighbor, so the next frontier has no duplicates
+        picks = row_starts[targets % n_nodes] + get_uniforms(
+            targets + counters_offset,
+            random_key,
+        )
+        frontier = targets[(edge_lows[edges] <= picks) & (picks < edge_highs[edges])]
+        activated[frontier] = True
+        activated_ids.append(frontier)
+
+    return np.bincount(
+        np.concatenate(activated_ids) // n_nodes,
+        minlength=n_simulations,
+    )
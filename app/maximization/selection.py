@@ -0,0 +1,278 @@
+"""Seed selection strategies shared by the diffusion models."""
+
+import heapq
+import math
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from app.maximization.dtos import SeedsSelection
+from app.vos import SeedSelectionMethod
+
+# Estimates the spreads of a batch of seed sets at once
+type SpreadEstimator = Callable[[list[set[Any]]], list[float]]
+
+# Marginal gains are differences of estimates evaluated at different iterations.
+# Rounding cancels out the floating point noise, so equal gains stay equal and
+# the ties are broken by the candidates order, as in the plain greedy algorithm.
+_GAIN_DECIMALS = 9
+
+
+def select_seeds(
+    candidates: set[Any],
+    n_top: int,
+    estimate_spreads: SpreadEstimator,
+    method: SeedSelectionMethod = SeedSelectionMethod.GREEDY,
+    min_marginal_gain: float | None = None,
+) -> SeedsSelection:
+    """Select `n_top` seeds among `candidates` maximizing `estimate_spreads`.
+
+    The seeds are returned in the order of selection along with the estimated
+    spread and marginal gain at each step, so every prefix is the solution for
+    the corresponding budget. The selection stops early once the best marginal
+    gain drops below `min_marginal_gain`.
+
+    The lazy strategies (CELF and CELF++) rely on the submodularity of the spread
+    function and select the same seeds as the plain greedy algorithm as long as
+    `estimate_spreads` is deterministic and submodular. That holds for the fixed
+    budget Monte Carlo estimates of both diffusion models, which replay the same
+    live-edge simulations for every seed set, and for the live-edge worlds ones.
+    All the strategies break ties in favor of the candidate that comes first in
+    `candidates`.
+    """
+    if min_marginal_gain is None:
+        min_marginal_gain = -math.inf
+
+    match method:
+        case SeedSelectionMethod.GREEDY:
+            select = _select_greedy
+        case SeedSelectionMethod.CELF:
+            select = _select_celf
+        case SeedSelectionMethod.CELF_PLUS_PLUS:
+            select = _select_celf_plus_plus
+    return select(candidates, n_top, estimate_spreads, min_marginal_gain)
+
+
+def _select_greedy(
+    candidates: set[Any],
+    n_top: int,
+    estimate_spreads: SpreadEstimator,
+    min_marginal_gain: float,
+) -> SeedsSelection:
+    selection = SeedsSelection(seeds=[], spreads=[], marginal_gains=[])
+    selected_seeds = selection.seeds
+    current_spread = 0.0
+
+    for _ in range(n_top):
+        remaining = [
+            candidate for candidate in candidates if candidate not in selected_seeds
+        ]
+        spreads = estimate_spreads(
+            [set(selected_seeds) | {candidate} for candidate in remaining]
+        )
+
+        best_candidate = None
+        best_spread = -1.0
+
+        for candidate, spread in zip(remaining, spreads, strict=True):
+            if spread > best_spread:
+                best_spread = spread
+                best_candidate = candidate
+
+        if best_candidate is None:
+            break
+
+        gain = round(best_spread - current_spread, _GAIN_DECIMALS)
+        if gain < min_marginal_gain:
+            break
+        _append_seed(selection, best_candidate, best_spread, gain)
+        current_spread = best_spread
+
+    return selection
+
+
+def _select_celf(
+    candidates: set[Any],
+    n_top: int,
+    estimate_spreads: SpreadEstimator,
+    min_marginal_gain: float,
+) -> SeedsSelection:
+    """Cost-Effective Lazy Forward selection.
+
+    The queue holds possibly stale marginal gains, which upper bound the actual
+    ones. A candidate is selected once its gain is the largest and is up to date
+    with the current seed set.
+    """
+    selection = SeedsSelection(seeds=[], spreads=[], marginal_gains=[])
+    selected_seeds = selection.seeds
+    current_spread = 0.0
+
+    ordered_candidates = list(candidates)
+    spreads = estimate_spreads([{candidate} for candidate in ordered_candidates])
+
+    # (negated marginal gain, tie-breaking order, candidate, |S| at evaluation)
+    queue: list[tuple[float, int, Any, int]] = [
+        (-round(spread, _GAIN_DECIMALS), order, candidate, 0)
+        for order, (candidate, spread) in enumerate(
+            zip(ordered_candidates, spreads, strict=True)
+        )
+    ]
+    heapq.heapify(queue)
+
+    while queue and len(selected_seeds) < n_top:
+        negated_gain, order, candidate, evaluated_at = heapq.heappop(queue)
+
+        if evaluated_at == len(selected_seeds):
+            if -negated_gain < min_marginal_gain:
+                break
+            current_spread -= negated_gain
+            _append_seed(selection, candidate, current_spread, -negated_gain)
+            continue
+
+        [spread] = estimate_spreads([set(selected_seeds) | {candidate}])
+        gain = round(spread - current_spread, _GAIN_DECIMALS)
+        heapq.heappush(queue, (-gain, order, candidate, len(selected_seeds)))
+
+    return selection
+
+
+def _select_celf_plus_plus(
+    candidates: set[Any],
+    n_top: int,
+    estimate_spreads: SpreadEstimator,
+    min_marginal_gain: float,
+) -> SeedsSelection:
+    """CELF++ selection (Goyal, Lu and Lakshmanan, 2011).
+
+    Along with the marginal gain w.r.t. the current seed set, each candidate keeps
+    its gain w.r.t. the seed set extended by the best candidate seen so far in the
+    iteration. If that best candidate gets selected next, the gain is reused
+    instead of being re-estimated.
+    """
+    spreads_cache = _SpreadsCache(estimate_spreads)
+
+    selection = SeedsSelection(seeds=[], spreads=[], marginal_gains=[])
+    selected_seeds = selection.seeds
+    current_spread = 0.0
+    last_seed: Any = None
+    current_best: Any = None
+    current_best_gain = -1.0
+
+    # candidate -> (mg1, prev_best, mg2, |S| at evaluation)
+    states: dict[Any, tuple[float, Any, float, int]] = {}
+    queue: list[tuple[float, int, Any]] = []
+
+    ordered_candidates = list(candidates)
+    spreads_cache.prefetch([frozenset({candidate}) for candidate in ordered_candidates])
+
+    prev_bests: list[Any] = []
+    for candidate in ordered_candidates:
+        prev_bests.append(current_best)
+        gain = spreads_cache.get(frozenset({candidate}))
+        if gain > current_best_gain:
+            current_best, current_best_gain = candidate, gain
+
+    spreads_cache.prefetch(
+        [
+            seed_set
+            for candidate, prev_best in zip(ordered_candidates, prev_bests, strict=True)
+            if prev_best is not None
+            for seed_set in (frozenset({prev_best}), frozenset({candidate, prev_best}))
+        ]
+    )
+    for order, (candidate, prev_best) in enumerate(
+        zip(ordered_candidates, prev_bests, strict=True)
+    ):
+        gain, gain_with_best = _get_celf_plus_plus_gains(
+            spreads_cache,
+            frozenset(),
+            candidate,
+            prev_best,
+        )
+        states[candidate] = (gain, prev_best, gain_with_best, 0)
+        queue.append((-gain, order, candidate))
+    heapq.heapify(queue)
+
+    while queue and len(selected_seeds) < n_top:
+        _, order, candidate = heapq.heappop(queue)
+        gain, prev_best, gain_with_best, evaluated_at = states[candidate]
+        n_selected = len(selected_seeds)
+
+        if evaluated_at == n_selected:
+            if gain < min_marginal_gain:
+                break
+            current_spread += gain
+            _append_seed(selection, candidate, current_spread, gain)
+            last_seed = candidate
+            current_best, current_best_gain = None, -1.0
+            continue
+
+        if prev_best == last_seed and evaluated_at == n_selected - 1:
+            gain = gain_with_best
+        else:
+            prev_best = current_best
+            gain, gain_with_best = _get_celf_plus_plus_gains(
+                spreads_cache,
+                frozenset(selected_seeds),
+                candidate,
+                current_best,
+            )
+
+        states[candidate] = (gain, prev_best, gain_with_best, n_selected)
+        heapq.heappush(queue, (-gain, order, candidate))
+
+        if gain > current_best_gain:
+            current_best, current_best_gain = candidate, gain
+
+    return selection
+
+
+def _append_seed(
+    selection: SeedsSelection,
+    seed: Hashable,
+    spread: float,
+    marginal_gain: float,
+) -> None:
+    selection.seeds.append(seed)
+    selection.spreads.append(spread)
+    selection.marginal_gains.append(marginal_gain)
+
+
+def _get_celf_plus_plus_gains(
+    spreads_cache: "_SpreadsCache",
+    seed_set: frozenset[Any],
+    candidate: Hashable,
+    current_best: Hashable | None,
+) -> tuple[float, float]:
+    """Get marginal gains of `candidate` w.r.t. `seed_set` and its extension."""
+    seed_sets = [seed_set, seed_set | {candidate}]
+    if current_best is not None:
+        extended_seed_set = seed_set | {current_best}
+        seed_sets += [extended_seed_set, extended_seed_set | {candidate}]
+
+    spreads_cache.prefetch(seed_sets)
+    spreads = [spreads_cache.get(seed_set) for seed_set in seed_sets]
+
+    gain = round(spreads[1] - spreads[0], _GAIN_DECIMALS)
+    if current_best is None:
+        return gain, gain
+    return gain, round(spreads[3] - spreads[2], _GAIN_DECIMALS)
+
+
+class _SpreadsCache:
+    """Memoizes the spreads of seed sets, estimating the missing ones in batches."""
+
+    def __init__(self, estimate_spreads: SpreadEstimator) -> None:
+        self._estimate_spreads = estimate_spreads
+        self._spreads: dict[frozenset[Any], float] = {frozenset(): 0.0}
+
+    def prefetch(self, seed_sets: list[frozenset[Any]]) -> None:
+        missing = list(dict.fromkeys(s for s in seed_sets if s not in self._spreads))
+        if not missing:
+            return
+
+        spreads = self._estimate_spreads([set(seed_set) for seed_set in missing])
+        self._spreads.update(zip(missing, spreads, strict=True))
+
+    def get(self, seed_set: frozenset[Any]) -> float:
+        self.prefetch([seed_set])
+        return self._spreads[seed_set]
@@ -0,0 +1,267 @@
+"""Spread estimation over pre-sampled live-edge worlds (StaticGreedy).
+
+A live-edge world is a random subgraph such that the nodes reachable from a seed
+set in it are distributed as the nodes activated by the diffusion model. Sampling
+the worlds once and evaluating every seed set against the same worlds makes the
+estimates cheap, deterministic, submodular, and comparable between candidates.
+"""
+
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from app.csr import CsrGraph, gather_ranges
+from app.maximization.draws import get_uniforms
+
+# Upper bound of the number of draws of a chunk of worlds sampled at once
+_WORLDS_CHUNK_DRAWS = 1 << 22
+
+
+def sample_ic_worlds(
+    csr_graph: CsrGraph,
+    edge_probabilities: np.ndarray,
+    n_worlds: int,
+    random_key: np.uint64,
+    *,
+    directed: bool = False,
+) -> "ComponentsSpreadEstimator | ReachSpreadEstimator":
+    """Sample Independent Cascade worlds, keeping each edge with its probability.
+
+    For undirected graphs the reachable nodes are the connected components of the
+    worlds, which are labeled once. Otherwise the reachable nodes of every seed
+    are computed on demand and cached. The worlds are sampled and labeled in
+    chunks, so only the live edges are kept for all of them.
+    """
+    n_nodes = csr_graph.n_nodes
+    sources = np.repeat(np.arange(n_nodes), csr_graph.degrees)
+    edges = np.arange(csr_graph.n_edges)
+    if not directed:
+        # A single draw per undirected edge
+        edges = edges[sources < csr_graph.indices]
+
+    live_sources: list[np.ndarray] = []
+    live_targets: list[np.ndarray] = []
+    labels: list[np.ndarray] = []
+    n_labels = 0
+
+    for start, stop in _get_worlds_chunks(n_worlds, edges.size):
+        world_ids = np.repeat(np.arange(stop - start), edges.size)
+        world_edges = np.tile(edges, stop - start)
+        draws = get_uniforms(
+            (world_ids + start) * csr_graph.n_edges + world_edges,
+            random_key,
+        )
+
+        is_live = draws < edge_probabilities[world_edges]
+        world_ids, world_edges = world_ids[is_live], world_edges[is_live]
+        chunk_sources = world_ids * n_nodes + sources[world_edges]
+        chunk_targets = world_ids * n_nodes + csr_graph.indices[world_edges]
+
+        if directed:
+            live_sources.append(chunk_sources + start * n_nodes)
+            live_targets.append(chunk_targets + start * n_nodes)
+            continue
+
+        chunk_graph = _build_worlds_graph(
+            chunk_sources,
+            chunk_targets,
+            (stop - start) * n_nodes,
+        )
+        n_chunk_labels, chunk_labels = connected_components(
+            chunk_graph,
+            directed=False,
+        )
+        labels.append(chunk_labels + n_labels)
+        n_labels += n_chunk_labels
+
+    if directed:
+        worlds_graph = _build_worlds_graph(
+            np.concatenate(live_sources),
+            np.concatenate(live_targets),
+            n_worlds * n_nodes,
+        )
+        return ReachSpreadEstimator(csr_graph, worlds_graph, n_worlds)
+
+    return ComponentsSpreadEstimator(
+        csr_graph,
+        np.concatenate(labels).reshape(n_worlds, n_nodes),
+    )
+
+
+def sample_lt_worlds(
+    csr_graph: CsrGraph,
+    edge_weights: np.ndarray,
+    n_worlds: int,
+    random_key: np.uint64,
+) -> "ReachSpreadEstimator":
+    """Sample Linear Threshold worlds.
+
+    In every world each node picks at most one of its neighbors, the neighbor
+    with the probability equal to its weight, and nothing with the remaining
+    probability. Influence flows from the picked neighbor to the node.
+
+    Args:
+        csr_graph: The graph.
+        edge_weights: The weights of the neighbors of each node, aligned with the
+            edges of `csr_graph`.
+        n_worlds: The number of worlds.
+        random_key: The key of the counter-based draws.
+    """
+    n_nodes = csr_graph.n_nodes
+    cumulative_weights = np.concatenate(([0.0], np.cumsum(edge_weights)))
+    row_starts = cumulative_weights[csr_graph.indptr[:-1]]
+    row_totals = cumulative_weights[csr_graph.indptr[1:]] - row_starts
+
+    live_sources: list[np.ndarray] = []
+    live_targets: list[np.ndarray] = []
+
+    for start, stop in _get_worlds_chunks(n_worlds, n_nodes):
+        ids = np.arange(start * n_nodes, stop * n_nodes)
+        nodes = ids % n_nodes
+        draws = get_uniforms(ids, random_key)
+
+        picks = draws < row_totals[nodes]
+        ids, nodes = ids[picks], nodes[picks]
+        edges = np.searchsorted(
+            cumulative_weights[1:],
+            row_starts[nodes] + draws[picks],
+            side="right",
+        )
+        edges = np.clip(
+            edges,
+            csr_graph.indptr[nodes],
+            csr_graph.indptr[nodes + 1] - 1,
+        )
+
+        live_sources.append(ids - nodes + csr_graph.indices[edges])
+        live_targets.append(ids)
+
+    worlds_graph = _build_worlds_graph(
+        np.concatenate(live_sources),
+        np.concatenate(live_targets),
+        n_worlds * n_nodes,
+    )
+    return ReachSpreadEstimator(csr_graph, worlds_graph, n_worlds)
+
+
+def _get_worlds_chunks(n_worlds: int, n_draws: int) -> Iterator[tuple[int, int]]:
+    """Split the worlds into chunks needing at most `_WORLDS_CHUNK_DRAWS` draws.
+
+    Args:
+        n_worlds: The number of worlds.
+        n_draws: The number of draws per world.
+
+    Yields:
+        The first and the past-the-end world of each chunk.
+    """
+    chunk_size = max(1, _WORLDS_CHUNK_DRAWS // max(n_draws, 1))
+    for start in range(0, n_worlds, chunk_size):
+        yield start, min(start + chunk_size, n_worlds)
+
+
+def _build_worlds_graph(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    n_nodes: int,
+) -> sp.csr_array:
+    """Build the disjoint union of the worlds, nodes encoded as `world * n + node`."""
+    return sp.csr_array(
+        (np.ones(sources.size, dtype=np.int8), (sources, targets)),
+        shape=(n_nodes, n_nodes),
+    )
+
+
+class ComponentsSpreadEstimator:
+    """Estimates spreads as the mean size of the components covered by seeds."""
+
+    def __init__(self, csr_graph: CsrGraph, labels: np.ndarray) -> None:
+        self._csr_graph = csr_graph
+        self._labels = labels
+        self._sizes = np.bincount(labels.ravel())
+        self.n_simulations_run = 0
+
+    def __call__(self, seed_sets: list[set[Any]]) -> list[float]:
+        n_worlds = self._labels.shape[0]
+        self.n_simulations_run += len(seed_sets) * n_worlds
+
+        spreads: list[float] = []
+        for seed_set in seed_sets:
+            indices = self._csr_graph.get_node_indices(seed_set)
+            covered_labels = np.unique(self._labels[:, indices])
+            spreads.append(float(self._sizes[covered_labels].sum()) / n_worlds)
+        return spreads
+
+
+class ReachSpreadEstimator:
+    """Estimates spreads as the mean number of nodes reachable from seeds.
+
+    The reachable nodes of a seed in all the worlds are computed once. The nodes
+    reachable from the seeds shared by the whole batch are marked once too, so
+    evaluating the marginal gains of the candidates w.r.t. the current seed set
+    costs as much as walking through the reachable nodes of the candidates.
+    """
+
+    def __init__(
+        self,
+        csr_graph: CsrGraph,
+        worlds_graph: sp.csr_array,
+        n_worlds: int,
+    ) -> None:
+        self._csr_graph = csr_graph
+        self._worlds_graph = worlds_graph
+        self._n_worlds = n_worlds
+
+        self._reached = np.zeros(worlds_graph.shape[0], dtype=bool)
+        self._reachable: dict[Any, np.ndarray] = {}
+        self.n_simulations_run = 0
+
+    def __call__(self, seed_sets: list[set[Any]]) -> list[float]:
+        if not seed_sets:
+            return []
+        self.n_simulations_run += len(seed_sets) * self._n_worlds
+
+        common_seeds = set.intersection(*seed_sets)
+        covered = np.zeros(self._worlds_graph.shape[0], dtype=bool)
+        for seed in common_seeds:
+            covered[self._get_reachable(seed)] = True
+        n_covered = int(covered.sum())
+
+        spreads: list[float] = []
+        for seed_set in seed_sets:
+            extra_seeds = seed_set - common_seeds
+            if not extra_seeds:
+                spreads.append(n_covered / self._n_worlds)
+                continue
+
+            reachable = np.concatenate([self._get_reachable(s) for s in extra_seeds])
+            n_new = np.unique(reachable[~covered[reachable]]).size
+            spreads.append((n_covered + n_new) / self._n_worlds)
+        return spreads
+
+    def _get_reachable(self, seed: Any) -> np.ndarray:  # noqa: ANN401
+        """Get the encoded nodes reachable from `seed` in all the worlds."""
+        if seed in self._reachable:
+            return self._reachable[seed]
+
+        n_nodes = self._csr_graph.n_nodes
+        frontier = (
+            np.arange(self._n_worlds) * n_nodes + self._csr_graph.node_index[seed]
+        )
+        self._reached[frontier] = True
+        reached = [frontier]
+
+        while frontier.size:
+            positions, _ = gather_ranges(self._worlds_graph.indptr, frontier)
+            targets = self._worlds_graph.indices[positions]
+            frontier = np.unique(targets[~self._reached[targets]])
+            self._reached[frontier] = True
+            reached.append(frontier)
+
+        reachable = np.concatenate(reached)
+        self._reached[reachable] = False
+
+        self._reachable[seed] = reachable
+        return reachable
@@ -0,0 +1,95 @@
+"""Process pool helpers."""
+
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any
+
+import numpy as np
+
+from app.csr import CsrGraph
+
+# Number of shards of the sources per worker, to balance uneven BFSs
+_SHARDS_PER_WORKER = 4
+
+# Gets the result of a shard of the sources over the graph
+type ShardResultGetter = Callable[[np.ndarray, CsrGraph], np.ndarray]
+
+_worker_csr_graph: CsrGraph | None = None
+
+
+def get_n_workers(n_workers: int | None = None) -> int:
+    """Resolve the number of worker processes, `None` meaning all the CPUs."""
+    if n_workers is None:
+        return os.cpu_count() or 1
+    return max(1, n_workers)
+
+
+@contextmanager
+def process_pool(
+    n_workers: int,
+    initializer: Callable[..., None] | None = None,
+    initargs: tuple[Any, ...] = (),
+) -> Iterator[Executor | None]:
+    """Provide a process pool, or `None` if a single worker is requested.
+
+    `initializer` runs once in every worker, which allows sending large shared
+    state (e.g. a CSR graph) once per worker instead of once per task.
+    """
+    if n_workers <= 1:
+        yield None
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=initializer,
+        initargs=initargs,
+    ) as executor:
+        yield executor
+
+
+def map_sources_shards(
+    get_shard_result: ShardResultGetter,
+    csr_graph: CsrGraph,
+    sources: np.ndarray | None,
+    n_workers: int | None = 1,
+) -> list[np.ndarray]:
+    """Shard the BFS sources across the workers and get the result of every shard.
+
+    The sources default to all the nodes. The graph is sent once per worker, and
+    there are a few shards per worker to balance uneven BFSs. A single worker gets
+    all the sources as a single shard, in the calling process.
+    """
+    if sources is None:
+        sources = np.arange(csr_graph.n_nodes)
+
+    n_workers = min(get_n_workers(n_workers), sources.size)
+    if n_workers <= 1:
+        return [get_shard_result(sources, csr_graph)]
+
+    shards = np.array_split(
+        sources,
+        min(n_workers * _SHARDS_PER_WORKER, sources.size),
+    )
+    with process_pool(
+        n_workers,
+        initializer=_init_worker,
+        initargs=(csr_graph,),
+    ) as executor:
+        return list(
+            executor.map(partial(_get_worker_shard_result, get_shard_result), shards)
+        )
+
+
+def _init_worker(csr_graph: CsrGraph) -> None:
+    global _worker_csr_graph  # noqa: PLW0603
+    _worker_csr_graph = csr_graph
+
+
+def _get_worker_shard_result(
+    get_shard_result: ShardResultGetter,
+    sources: np.ndarray,
+) -> np.ndarray:
+    return get_shard_result(sources, _worker_csr_graph)
@@ -26,3 +26,43 @@ class SupportedDataSets(Enum):
             if member.data_set_name == value:
                 return member
         raise ValueError(f"{value} is not a valid {cls.__name__}")
+
+
+class SeedSelectionMethod(Enum):
+    """Strategies of selecting seeds in the influence maximization problem."""
+
+    GREEDY = "GREEDY"
+    CELF = "CELF"
+    CELF_PLUS_PLUS = "CELF++"
+
+
+class SpreadEstimationMethod(Enum):
+    """Ways of estimating the spread of a seed set."""
+
+    MONTE_CARLO = "MONTE_CARLO"
+    LIVE_EDGE_WORLDS = "LIVE_EDGE_WORLDS"
+
+
+class CandidatesStrategy(Enum):
+    """Strategies of preselecting candidate seeds by a node score."""
+
+    BETWEENNESS = "BETWEENNESS"
+    PAGERANK = "PAGERANK"
+    DEGREE = "DEGREE"
+    CLOSENESS = "CLOSENESS"
+
+
+class BfsEngine(Enum):
+    """Engines of the all-pairs breadth-first searches."""
+
+    BATCHED = "BATCHED"
+    BIT_PARALLEL = "BIT_PARALLEL"
+
+
+class CommunityDetectionAlgorithm(Enum):
+    """Algorithms of the communities detection."""
+
+    LOUVAIN = "LOUVAIN"
+    ASYN_LPA = "ASYN_LPA"
+    CSR_LOUVAIN = "CSR_LOUVAIN"
+    LEIDEN = "LEIDEN"
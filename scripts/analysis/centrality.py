@@ -20,7 +20,7 @@ def main() -> None:
     logger.info("Graph in use", name=graph_name)
     graph = data_set.get_data_set_func()
 
-    calculate_centrality_analysis(graph, graph_name)
+    calculate_centrality_analysis(graph, graph_name, configs.ANALYSIS_N_WORKERS)
 
 
 if __name__ == "__main__":
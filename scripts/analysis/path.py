@@ -20,7 +20,12 @@ def main() -> None:
     logger.info("Graph in use", name=graph_name)
     graph = data_set.get_data_set_func()
 
-    calculate_path_analysis(graph, graph_name)
+    calculate_path_analysis(
+        graph,
+        graph_name,
+        configs.ANALYSIS_N_WORKERS,
+        with_distribution=configs.ANALYSIS_PATH_LENGTH_DISTRIBUTION,
+    )
 
 
 if __name__ == "__main__":
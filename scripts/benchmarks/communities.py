@@ -0,0 +1,108 @@
+"""Benchmark of the Louvain and Leiden engines on the data set.
+
+Every engine partitions the configured data set with the same seed. The
+modularity of the partitions is computed by NetworkX for all of them, and the
+speedups and the modularity differences are reported relative to the NetworkX
+Louvain. The CSR engines are timed from the graph, the sparse adjacency
+conversion included. The results are written to a JSON file per run.
+"""
+
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import structlog
+
+from scripts.benchmarks.reports import save_report
+
+from app.analysis.leiden import get_communities
+from app.configs import get_configs
+from app.constants import SEED_VALUE
+from app.logs import configure_logs
+
+# Partitions a graph into communities of nodes
+type Engine = Callable[[nx.Graph], list[set[Any]]]
+
+
+def _run_networkx(graph: nx.Graph) -> list[set[Any]]:
+    return nx.algorithms.community.louvain_communities(graph, seed=SEED_VALUE)
+
+
+def _run_csr_engine(graph: nx.Graph, *, refine: bool) -> list[set[Any]]:
+    labels = get_communities(
+        nx.to_scipy_sparse_array(graph, weight="weight", format="csr"),
+        refine=refine,
+        seed=SEED_VALUE,
+    )
+
+    communities: list[set[Any]] = [set() for _ in range(int(labels.max()) + 1)]
+    for node, label in zip(graph.nodes(), labels.tolist(), strict=True):
+        communities[label].add(node)
+    return communities
+
+
+def _get_engines() -> dict[str, Engine]:
+    return {
+        "networkx_louvain": _run_networkx,
+        "csr_louvain": partial(_run_csr_engine, refine=False),
+        "leiden": partial(_run_csr_engine, refine=True),
+    }
+
+
+def main() -> None:
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    started_at = datetime.now(UTC)
+    data_set = get_configs().DATA_SET
+    graph = data_set.get_data_set_func()
+
+    reference_modularity: float | None = None
+    reference_wall_time: float | None = None
+    results: list[dict[str, Any]] = []
+
+    for engine_name, engine in _get_engines().items():
+        logger.info("Benchmarking", graph=data_set.data_set_name, engine=engine_name)
+
+        start = time.perf_counter()
+        communities = engine(graph)
+        wall_time = time.perf_counter() - start
+
+        modularity = nx.algorithms.community.modularity(graph, communities)
+        if reference_modularity is None:
+            reference_modularity, reference_wall_time = modularity, wall_time
+
+        result = {
+            "graph": data_set.data_set_name,
+            "n_nodes": graph.number_of_nodes(),
+            "n_edges": graph.number_of_edges(),
+            "engine": engine_name,
+            "wall_time_s": wall_time,
+            "speedup": reference_wall_time / wall_time,
+            "n_communities": len(communities),
+            "modularity": modularity,
+            "modularity_difference": modularity - reference_modularity,
+            "n_disconnected_communities": sum(
+                not nx.is_connected(graph.subgraph(community))
+                for community in communities
+            ),
+        }
+        logger.info("Benchmarked", **result)
+        results.append(result)
+
+    save_report(
+        "communities",
+        started_at,
+        {"seed": SEED_VALUE},
+        results,
+    )
+
+
+if __name__ == "__main__":
+    logs_file_path = Path("scripts", "logs", "benchmarks_communities.log")
+    configure_logs(logs_file_path=logs_file_path)
+
+    main()
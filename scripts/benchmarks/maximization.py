@@ -0,0 +1,239 @@
+"""Benchmark of the influence maximization engines over scaled graphs.
+
+Every engine is timed on reference model graphs of increasing size and on the
+configured data set. Along with the seed selection methods and the spread
+estimation methods, the Monte Carlo estimation is benchmarked over several worker
+counts, with the adaptive confidence interval width, and with racing. The spread
+achieved by the seeds is re-evaluated with an independent set of live-edge
+worlds, so the engines are compared fairly. The results are written to a JSON
+file per run. The peak memory is traced in the main process only, run with
+`MAXIMIZATION_N_WORKERS=1` to account for all of it.
+"""
+
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import structlog
+
+from scripts.benchmarks.reports import save_report
+
+from app.configs import get_configs
+from app.constants import SEED_VALUE
+from app.csr import to_csr_graph
+from app.graphs import create_ba_graph, create_er_graph, create_ws_graph
+from app.logs import configure_logs
+from app.maximization import (
+    get_candidates,
+    get_independent_cascade_top_influential_nodes,
+    get_independent_cascade_top_influential_nodes_imm,
+    get_linear_threshold_top_influential_nodes,
+)
+from app.maximization.cascade import generate_edge_probabilities
+from app.maximization.draws import get_random_key
+from app.maximization.dtos import SeedsSelection
+from app.maximization.linear import generate_edge_weights
+from app.maximization.worlds import sample_ic_worlds, sample_lt_worlds
+from app.vos import CandidatesStrategy, SeedSelectionMethod, SpreadEstimationMethod
+
+GRAPH_SIZES = (1000, 2000, 4000)
+N_TOP = 10
+N_CANDIDATES = 50
+NUM_SIMULATIONS = 50
+N_REFERENCE_WORLDS = 200
+N_WORKERS = (1, 2, 4)
+CI_WIDTH = 20.0
+MAX_SIMULATIONS = 500
+
+# Runs an engine given a graph and candidates. Returns the seeds and the number
+# of simulations, the sampled RR sets for IMM
+type Engine = Callable[[nx.Graph, set[Any]], tuple[list[Any], int]]
+
+
+def _run_maximizer(
+    maximize: Callable[..., SeedsSelection],
+    options: dict[str, Any],
+    graph: nx.Graph,
+    candidates: set[Any],
+) -> tuple[list[Any], int]:
+    selection = maximize(graph, N_TOP, candidates, NUM_SIMULATIONS, **options)
+    return selection.seeds, selection.n_simulations
+
+
+def _run_imm(graph: nx.Graph, _: set[Any]) -> tuple[list[Any], int]:
+    selection = get_independent_cascade_top_influential_nodes_imm(graph, N_TOP)
+    return selection.seeds, selection.n_simulations
+
+
+def _get_engines() -> dict[str, tuple[str, Engine]]:
+    """Get the engines by name, along with the diffusion model they rely on."""
+    n_workers = get_configs().MAXIMIZATION_N_WORKERS
+    engines: dict[str, tuple[str, Engine]] = {}
+
+    for model, maximize in (
+        ("IC", get_independent_cascade_top_influential_nodes),
+        ("LT", get_linear_threshold_top_influential_nodes),
+    ):
+        for estimation_method in SpreadEstimationMethod:
+            for method in SeedSelectionMethod:
+                options = {
+                    "method": method,
+                    "n_workers": n_workers,
+                    "estimation_method": estimation_method,
+                }
+                engines[f"{model} {estimation_method.value} {method.value}"] = (
+                    model,
+                    partial(_run_maximizer, maximize, options),
+                )
+
+        monte_carlo = f"{model} {SpreadEstimationMethod.MONTE_CARLO.value}"
+        celf = SeedSelectionMethod.CELF
+        greedy = SeedSelectionMethod.GREEDY
+        variants: dict[str, dict[str, Any]] = {
+            f"{celf.value} n_workers={count}": {"method": celf, "n_workers": count}
+            for count in N_WORKERS
+        }
+        variants[f"{celf.value} ci_width={CI_WIDTH}"] = {
+            "method": celf,
+            "n_workers": n_workers,
+            "ci_width": CI_WIDTH,
+            "max_simulations": MAX_SIMULATIONS,
+        }
+        variants[f"{greedy.value} racing"] = {
+            "method": greedy,
+            "n_workers": n_workers,
+            "racing": True,
+        }
+        for variant_name, options in variants.items():
+            engines[f"{monte_carlo} {variant_name}"] = (
+                model,
+                partial(_run_maximizer, maximize, options),
+            )
+
+    engines["IC IMM"] = ("IC", _run_imm)
+    return engines
+
+
+def _get_graphs() -> dict[str, nx.Graph]:
+    """Get the reference model graphs scaled after the data set and the data set."""
+    data_set = get_configs().DATA_SET
+    data_set_graph = data_set.get_data_set_func()
+    average_degree = data_set_graph.number_of_edges() / data_set_graph.number_of_nodes()
+
+    graphs: dict[str, nx.Graph] = {}
+    for n_nodes in GRAPH_SIZES:
+        n_edges = round(average_degree * n_nodes)
+        graphs[f"ER {n_nodes}"] = create_er_graph(n_nodes, n_edges)
+        graphs[f"BA {n_nodes}"] = create_ba_graph(n_nodes, n_edges)
+        graphs[f"WS {n_nodes}"] = create_ws_graph(n_nodes, n_edges)
+
+    graphs[data_set.data_set_name] = data_set_graph
+    return graphs
+
+
+def _evaluate_spread(graph: nx.Graph, model: str, seeds: list[Any]) -> float:
+    """Evaluate the spread of `seeds` over worlds independent of the engines."""
+    csr_graph = to_csr_graph(graph)
+    random_key = get_random_key(seed=SEED_VALUE + 1)
+
+    if model == "IC":
+        estimate_spreads = sample_ic_worlds(
+            csr_graph,
+            generate_edge_probabilities(csr_graph),
+            N_REFERENCE_WORLDS,
+            random_key,
+            directed=graph.is_directed(),
+        )
+    else:
+        estimate_spreads = sample_lt_worlds(
+            csr_graph,
+            generate_edge_weights(csr_graph),
+            N_REFERENCE_WORLDS,
+            random_key,
+        )
+
+    [spread] = estimate_spreads([set(seeds)])
+    return spread
+
+
+def _run_engine(
+    engine: Engine,
+    graph: nx.Graph,
+    candidates: set[Any],
+) -> tuple[list[Any], int, float, int]:
+    """Run an engine, measuring its wall time and peak traced memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        seeds, n_simulations = engine(graph, candidates)
+        wall_time = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return seeds, n_simulations, wall_time, peak_memory
+
+
+def main() -> None:
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    started_at = datetime.now(UTC)
+    engines = _get_engines()
+    results: list[dict[str, Any]] = []
+
+    for graph_name, graph in _get_graphs().items():
+        candidates = get_candidates(
+            graph,
+            strategies=(CandidatesStrategy.DEGREE,),
+            n_per_strategy=N_CANDIDATES,
+        )
+
+        for engine_name, (model, engine) in engines.items():
+            logger.info("Benchmarking", graph=graph_name, engine=engine_name)
+            seeds, n_simulations, wall_time, peak_memory = _run_engine(
+                engine,
+                graph,
+                candidates,
+            )
+
+            result = {
+                "graph": graph_name,
+                "n_nodes": graph.number_of_nodes(),
+                "n_edges": graph.number_of_edges(),
+                "engine": engine_name,
+                "wall_time_s": wall_time,
+                "n_simulations": n_simulations,
+                "simulations_per_s": n_simulations / wall_time,
+                "peak_memory_bytes": peak_memory,
+                "spread": _evaluate_spread(graph, model, seeds),
+                "seeds": seeds,
+            }
+            logger.info("Benchmarked", **result)
+            results.append(result)
+
+    save_report(
+        "maximization",
+        started_at,
+        {
+            "n_top": N_TOP,
+            "n_candidates": N_CANDIDATES,
+            "num_simulations": NUM_SIMULATIONS,
+            "n_reference_worlds": N_REFERENCE_WORLDS,
+            "n_workers": get_configs().MAXIMIZATION_N_WORKERS,
+            "ci_width": CI_WIDTH,
+            "max_simulations": MAX_SIMULATIONS,
+        },
+        results,
+    )
+
+
+if __name__ == "__main__":
+    logs_file_path = Path("scripts", "logs", "benchmarks_maximization.log")
+    configure_logs(logs_file_path=logs_file_path)
+
+    main()
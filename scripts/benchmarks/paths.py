@@ -0,0 +1,108 @@
+"""Benchmark of the all-pairs shortest path length engines on the data set.
+
+Every engine counts the ordered pairs of the configured data set by their
+distance. The counts of the BFS engines are checked against the NetworkX
+reference, and the speedups are reported relative to it. The results are written
+to a JSON file per run.
+"""
+
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import numpy as np
+import structlog
+
+from scripts.benchmarks.reports import save_report
+
+from app.analysis.distances import get_distances_histogram
+from app.configs import get_configs
+from app.csr import to_csr_graph
+from app.logs import configure_logs
+from app.vos import BfsEngine
+
+# Counts the ordered pairs of a graph by their distance
+type Engine = Callable[[nx.Graph], np.ndarray]
+
+
+def _run_networkx(graph: nx.Graph) -> np.ndarray:
+    histogram = np.zeros(max(graph.number_of_nodes(), 1), dtype=np.int64)
+    for _, lengths in nx.all_pairs_shortest_path_length(graph):
+        histogram += np.bincount(
+            np.fromiter(lengths.values(), dtype=np.int64),
+            minlength=histogram.size,
+        )
+    return histogram
+
+
+def _run_bfs_engine(
+    engine: BfsEngine,
+    n_workers: int | None,
+    graph: nx.Graph,
+) -> np.ndarray:
+    return get_distances_histogram(
+        to_csr_graph(graph),
+        n_workers=n_workers,
+        engine=engine,
+    )
+
+
+def _get_engines() -> dict[str, Engine]:
+    n_workers = get_configs().ANALYSIS_N_WORKERS
+
+    engines: dict[str, Engine] = {"networkx": _run_networkx}
+    for engine in BfsEngine:
+        engines[engine.value] = partial(_run_bfs_engine, engine, n_workers)
+    return engines
+
+
+def main() -> None:
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    started_at = datetime.now(UTC)
+    data_set = get_configs().DATA_SET
+    graph = data_set.get_data_set_func()
+
+    reference_histogram: np.ndarray | None = None
+    reference_wall_time: float | None = None
+    results: list[dict[str, Any]] = []
+
+    for engine_name, engine in _get_engines().items():
+        logger.info("Benchmarking", graph=data_set.data_set_name, engine=engine_name)
+
+        start = time.perf_counter()
+        histogram = engine(graph)
+        wall_time = time.perf_counter() - start
+
+        if reference_histogram is None:
+            reference_histogram, reference_wall_time = histogram, wall_time
+
+        result = {
+            "graph": data_set.data_set_name,
+            "n_nodes": graph.number_of_nodes(),
+            "n_edges": graph.number_of_edges(),
+            "engine": engine_name,
+            "wall_time_s": wall_time,
+            "speedup": reference_wall_time / wall_time,
+            "matches_reference": bool(np.array_equal(histogram, reference_histogram)),
+        }
+        logger.info("Benchmarked", **result)
+        results.append(result)
+
+    save_report(
+        "paths",
+        started_at,
+        {"n_workers": get_configs().ANALYSIS_N_WORKERS},
+        results,
+    )
+
+
+if __name__ == "__main__":
+    logs_file_path = Path("scripts", "logs", "benchmarks_paths.log")
+    configure_logs(logs_file_path=logs_file_path)
+
+    main()
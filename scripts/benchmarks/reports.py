@@ -0,0 +1,49 @@
+"""Reports shared by the benchmark scripts, not a benchmark itself."""
+
+import json
+import os
+import platform
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import numpy as np
+import scipy
+import structlog
+
+RESULTS_DIRECTORY = Path("scripts", "benchmarks", "results")
+
+
+def save_report(
+    benchmark_name: str,
+    started_at: datetime,
+    settings: dict[str, Any],
+    results: list[dict[str, Any]],
+) -> Path:
+    """Save the results of a benchmark run to a JSON file, along with the setup.
+
+    The file is named after the benchmark and the start of the run, and records
+    the versions of the libraries and the number of CPUs next to `settings`.
+    """
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    RESULTS_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    results_file_path = RESULTS_DIRECTORY / Path(
+        f"{benchmark_name}_{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    report = {
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "networkx": nx.__version__,
+        "n_cpus": os.cpu_count(),
+        "settings": settings,
+        "results": results,
+    }
+    with results_file_path.open("w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    logger.info("Benchmark results saved", results_file_path=str(results_file_path))
+    return results_file_path
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import seaborn as sns
+import structlog
+
+from app.analysis.communities import detect_communities
+from app.configs import get_configs
+from app.logs import configure_logs
+from app.vos import CommunityDetectionAlgorithm
+
+
+def main() -> None:
+    configs = get_configs()
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    sns.set_theme(style=configs.SEABORD_STYLE)
+
+    data_set = configs.DATA_SET
+    graph_name = data_set.data_set_name
+
+    logger.info("Graph in use", name=graph_name)
+    graph = data_set.get_data_set_func()
+
+    detect_communities(
+        graph,
+        graph_name,
+        CommunityDetectionAlgorithm.LEIDEN,
+        configs.ANALYSIS_COMMUNITIES_N_SEEDS,
+        configs.ANALYSIS_N_WORKERS,
+        configs.ANALYSIS_COMMUNITIES_CONSENSUS_THRESHOLD,
+    )
+
+
+if __name__ == "__main__":
+    logs_file_path = Path("scripts", "logs", "leiden.log")
+    configure_logs(logs_file_path=logs_file_path)
+
+    main()
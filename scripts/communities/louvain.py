@@ -3,9 +3,10 @@ from pathlib import Path
 import seaborn as sns
 import structlog
 
-from app.analysis.communities import detect_communities_louvain
+from app.analysis.communities import detect_communities
 from app.configs import get_configs
 from app.logs import configure_logs
+from app.vos import CommunityDetectionAlgorithm
 
 
 def main() -> None:
@@ -20,7 +21,14 @@ def main() -> None:
     logger.info("Graph in use", name=graph_name)
     graph = data_set.get_data_set_func()
 
-    detect_communities_louvain(graph, graph_name)
+    detect_communities(
+        graph,
+        graph_name,
+        CommunityDetectionAlgorithm.CSR_LOUVAIN,
+        configs.ANALYSIS_COMMUNITIES_N_SEEDS,
+        configs.ANALYSIS_N_WORKERS,
+        configs.ANALYSIS_COMMUNITIES_CONSENSUS_THRESHOLD,
+    )
 
 
 if __name__ == "__main__":
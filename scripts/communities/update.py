@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import networkx as nx
+import structlog
+
+from app.analysis.communities import load_updated_graph, update_communities
+from app.configs import get_configs
+from app.data.source import import_graph_from_csv
+from app.logs import configure_logs
+from app.vos import CommunityDetectionAlgorithm
+
+
+def _import_edges(file_path: Path | None) -> list[tuple[int, int]]:
+    if file_path is None:
+        return []
+    return list(import_graph_from_csv(nx.Graph(), file_path).edges())
+
+
+def main() -> None:
+    configs = get_configs()
+    logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+    data_set = configs.DATA_SET
+    graph_name = data_set.data_set_name
+
+    logger.info("Graph in use", name=graph_name)
+    # The batches apply on top of the ones of the previous runs
+    graph = load_updated_graph(graph_name, CommunityDetectionAlgorithm.LEIDEN)
+    if graph is None:
+        graph = data_set.get_data_set_func()
+
+    inserted_edges = _import_edges(
+        configs.ANALYSIS_COMMUNITIES_INSERTED_EDGES_FILE_PATH
+    )
+    deleted_edges = _import_edges(configs.ANALYSIS_COMMUNITIES_DELETED_EDGES_FILE_PATH)
+    logger.info(
+        "Edge changes in use",
+        n_inserted_edges=len(inserted_edges),
+        n_deleted_edges=len(deleted_edges),
+    )
+
+    update = update_communities(
+        graph,
+        graph_name,
+        inserted_edges,
+        deleted_edges,
+        CommunityDetectionAlgorithm.LEIDEN,
+    )
+    logger.info(
+        "Communities refreshed" if update.is_refreshed else "Communities kept",
+        n_communities=int(update.labels.max()) + 1 if update.labels.size else 0,
+        modularity=update.evaluation.modularity,
+    )
+
+
+if __name__ == "__main__":
+    logs_file_path = Path("scripts", "logs", "communities_update.log")
+    configure_logs(logs_file_path=logs_file_path)
+
+    main()
@@ -1,33 +1,19 @@
 from pathlib import Path
-from typing import Any
 
-import networkx as nx
 import seaborn as sns
 import structlog
 
 from app.configs import get_configs
 from app.logs import configure_logs
 from app.maximization import (
+    get_candidates,
     get_independent_cascade_top_influential_nodes,
+    get_independent_cascade_top_influential_nodes_imm,
     get_linear_threshold_top_influential_nodes,
     visualize_influential_nodes,
 )
 
 
-def _get_candidates(graph: nx.Graph, n_candidates: int = 50) -> set[Any]:
-    top_n = n_candidates // 2
-
-    betweenness = nx.betweenness_centrality(graph)
-    top_n_betweenness = set(
-        sorted(betweenness, key=betweenness.get, reverse=True)[:top_n]
-    )
-
-    pagerank = nx.pagerank(graph)
-    top_n_pagerank = set(sorted(pagerank, key=pagerank.get, reverse=True)[:top_n])
-
-    return top_n_betweenness | top_n_pagerank
-
-
 def main(n_top_influencial_nodes: int) -> None:
     configs = get_configs()
     logger: structlog.stdlib.BoundLogger = structlog.get_logger()
@@ -40,36 +26,78 @@ def main(n_top_influencial_nodes: int) -> None:
     logger.info("Graph in use", name=graph_name)
     graph = data_set.get_data_set_func()
 
-    candidates = _get_candidates(graph)
+    candidates = get_candidates(
+        graph,
+        graph_name,
+        configs.MAXIMIZATION_CANDIDATES_STRATEGIES,
+        configs.MAXIMIZATION_N_CANDIDATES_PER_STRATEGY,
+        configs.MAXIMIZATION_BETWEENNESS_K,
+        configs.MAXIMIZATION_N_WORKERS,
+    )
 
-    ic_top_influencial_nodes = get_independent_cascade_top_influential_nodes(
+    ic_selection = get_independent_cascade_top_influential_nodes(
         graph,
         n_top_influencial_nodes,
         candidates,
+        method=configs.MAXIMIZATION_SEED_SELECTION_METHOD,
+        n_workers=configs.MAXIMIZATION_N_WORKERS,
+        estimation_method=configs.MAXIMIZATION_SPREAD_ESTIMATION_METHOD,
+        ci_width=configs.MAXIMIZATION_CI_WIDTH,
+        racing=configs.MAXIMIZATION_RACING,
+        max_simulations=configs.MAXIMIZATION_MAX_SIMULATIONS,
+        min_marginal_gain=configs.MAXIMIZATION_MIN_MARGINAL_GAIN,
     )
     logger.info(
         "Independent Cascade: Top influencial nodes",
-        nodes=ic_top_influencial_nodes,
+        nodes=ic_selection.seeds,
+        spreads=ic_selection.spreads,
+        marginal_gains=ic_selection.marginal_gains,
     )
     visualize_influential_nodes(
         graph,
-        ic_top_influencial_nodes,
+        ic_selection.seeds,
         "Independent Cascade",
         graph_name,
     )
 
-    lt_top_influencial_nodes = get_linear_threshold_top_influential_nodes(
+    imm_selection = get_independent_cascade_top_influential_nodes_imm(
+        graph,
+        n_top_influencial_nodes,
+    )
+    logger.info(
+        "Independent Cascade (IMM): Top influencial nodes",
+        nodes=imm_selection.seeds,
+        spreads=imm_selection.spreads,
+        marginal_gains=imm_selection.marginal_gains,
+    )
+    visualize_influential_nodes(
+        graph,
+        imm_selection.seeds,
+        "Independent Cascade (IMM)",
+        graph_name,
+    )
+
+    lt_selection = get_linear_threshold_top_influential_nodes(
         graph,
         n_top_influencial_nodes,
         candidates,
+        method=configs.MAXIMIZATION_SEED_SELECTION_METHOD,
+        n_workers=configs.MAXIMIZATION_N_WORKERS,
+        estimation_method=configs.MAXIMIZATION_SPREAD_ESTIMATION_METHOD,
+        ci_width=configs.MAXIMIZATION_CI_WIDTH,
+        racing=configs.MAXIMIZATION_RACING,
+        max_simulations=configs.MAXIMIZATION_MAX_SIMULATIONS,
+        min_marginal_gain=configs.MAXIMIZATION_MIN_MARGINAL_GAIN,
     )
     logger.info(
         "Linear Threshold: Top influencial nodes",
-        nodes=lt_top_influencial_nodes,
+        nodes=lt_selection.seeds,
+        spreads=lt_selection.spreads,
+        marginal_gains=lt_selection.marginal_gains,
     )
     visualize_influential_nodes(
         graph,
-        lt_top_influencial_nodes,
+        lt_selection.seeds,
         "Linear Threshold",
         graph_name,
     )